@@ -0,0 +1,158 @@
+# Vectorized Monte Carlo runner for the single-shop model in main.py
+# Steps R independent replications together with NumPy arrays of shape (R,)
+
+import numpy as np
+
+# Ticks of random numbers drawn per replication at a time
+DRAW_BLOCK = 256
+
+class BatchSimulation:
+    def __init__(self, replications, max_inventory=10, lead_time=3, max_time=100, max_customer_interval=5, min_demand=1, max_demand=5, seed=None, seeds=None):
+        """
+        Runs `replications` copies of main.Simulation side by side. Each step
+        follows Simulation.step: receive shipments, serve waiting customers
+        FIFO (full demand only), then a customer may arrive, which always
+        orders its demand from the manufacturer.
+
+        Every replication has its own Generator. Its seed is drawn from
+        `seed` (or given explicitly in `seeds`) and kept in self.seeds, so any
+        replication can be rerun on its own with seeds=[self.seeds[r]].
+        """
+        self.replications = replications
+        self.max_inventory = max_inventory
+        self.lead_time = lead_time
+        self.max_time = max_time
+        self.max_customer_interval = max_customer_interval
+        self.min_demand = min_demand
+        self.max_demand = max_demand
+        if seeds is None:
+            seeds = np.random.default_rng(seed).integers(0, 2**63, size=replications)
+        self.seeds = np.asarray(seeds)
+        assert len(self.seeds) == replications
+        self.reset()
+
+    def reset(self):
+        R = self.replications
+        self.time = 0
+        self.generators = [np.random.default_rng(s) for s in self.seeds]
+        self.inventory = np.full(R, self.max_inventory, dtype=np.int64)
+        # In-transit pipeline: slot t % delay holds what arrives at tick t.
+        # A zero lead time order is still only received on the next tick.
+        self.delay = max(self.lead_time, 1)
+        self.pipeline = np.zeros((R, self.delay), dtype=np.int64)
+        # Customer queue: per-replication ring buffer of demands
+        self.queue = np.zeros((R, 8), dtype=np.int64)
+        self.queue_head = np.zeros(R, dtype=np.int64)
+        self.queue_count = np.zeros(R, dtype=np.int64)
+        self.backlog = np.zeros(R, dtype=np.int64)  # Total demand waiting in the queue
+        self.next_customer_time = np.zeros(R, dtype=np.int64)
+        # Running totals for the summary
+        self.demand_total = np.zeros(R, dtype=np.int64)
+        self.filled_on_arrival = np.zeros(R, dtype=np.int64)
+        self.inventory_sum = np.zeros(R, dtype=np.int64)
+        self.backlog_sum = np.zeros(R, dtype=np.int64)
+        self.in_transit_sum = np.zeros(R, dtype=np.int64)
+
+    def _draw_block(self):
+        """
+        Draws the demand and next-interval numbers for the next DRAW_BLOCK
+        ticks of every replication. Each tick gets its own pair; it is only
+        used if a customer arrives at that tick.
+        """
+        demands = np.empty((self.replications, DRAW_BLOCK), dtype=np.int64)
+        intervals = np.empty((self.replications, DRAW_BLOCK), dtype=np.int64)
+        for r, generator in enumerate(self.generators):
+            demands[r] = generator.integers(self.min_demand, self.max_demand + 1, size=DRAW_BLOCK)
+            intervals[r] = generator.integers(1, self.max_customer_interval + 1, size=DRAW_BLOCK)
+        self.demand_block = demands
+        self.interval_block = intervals
+
+    def _grow_queue(self):
+        # Unroll each ring so the queue starts at column 0, then double it
+        capacity = self.queue.shape[1]
+        order = (self.queue_head[:, None] + np.arange(capacity)) % capacity
+        unrolled = np.take_along_axis(self.queue, order, axis=1)
+        self.queue = np.zeros((self.replications, 2 * capacity), dtype=np.int64)
+        self.queue[:, :capacity] = unrolled
+        self.queue_head[:] = 0
+
+    def step(self):
+        """
+        Advance all replications by one time step.
+        """
+        t = self.time
+        rows = np.arange(self.replications)
+        if t % DRAW_BLOCK == 0:
+            self._draw_block()
+
+        # 1. Process incoming shipments (inventory is capped at max_inventory)
+        slot = t % self.delay
+        self.inventory = np.minimum(self.inventory + self.pipeline[:, slot], self.max_inventory)
+        self.pipeline[:, slot] = 0
+
+        # 2. Serve waiting customers FIFO while the head demand can be met
+        capacity = self.queue.shape[1]
+        while True:
+            head_demand = self.queue[rows, self.queue_head]
+            serve = (self.queue_count > 0) & (self.inventory >= head_demand)
+            if not serve.any():
+                break
+            served = np.where(serve, head_demand, 0)
+            self.inventory -= served
+            self.backlog -= served
+            self.queue_head = np.where(serve, (self.queue_head + 1) % capacity, self.queue_head)
+            self.queue_count -= serve
+
+        # 3. Customer arrival: order the demand, serve it now or queue it
+        arrived = t >= self.next_customer_time
+        demand = np.where(arrived, self.demand_block[:, t % DRAW_BLOCK], 0)
+        self.pipeline[:, (t + self.lead_time) % self.delay] += demand
+        self.demand_total += demand
+        served_now = arrived & (self.queue_count == 0) & (self.inventory >= demand)
+        self.inventory -= np.where(served_now, demand, 0)
+        self.filled_on_arrival += np.where(served_now, demand, 0)
+        queued = arrived & ~served_now
+        if queued.any():
+            if (self.queue_count[queued] == capacity).any():
+                self._grow_queue()
+                capacity = self.queue.shape[1]
+            tail = (self.queue_head + self.queue_count) % capacity
+            self.queue[rows[queued], tail[queued]] = demand[queued]
+            self.queue_count += queued
+            self.backlog += np.where(queued, demand, 0)
+        self.next_customer_time = np.where(arrived, t + self.interval_block[:, t % DRAW_BLOCK], self.next_customer_time)
+
+        # 4. Collect stats
+        self.inventory_sum += self.inventory
+        self.backlog_sum += self.backlog
+        self.in_transit_sum += self.pipeline.sum(axis=1)
+        self.time += 1
+
+    def is_finished(self):
+        return self.time >= self.max_time
+
+    def run(self):
+        while not self.is_finished():
+            self.step()
+        return self.summary()
+
+    def summary(self):
+        """
+        Per-replication results as arrays of shape (R,):
+        - 'fill_rate': fraction of demanded units served from stock on arrival
+          (nan if there was no demand)
+        - 'mean_backlog': average total demand waiting in the customer queue
+        - 'mean_inventory': average inventory
+        - 'mean_in_transit': average quantity ordered but not yet received
+        Averages are over the ticks run so far, taken at the end of each tick.
+        """
+        ticks = max(self.time, 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fill_rate = np.where(self.demand_total > 0, self.filled_on_arrival / self.demand_total, np.nan)
+        return {
+            'seed': self.seeds,
+            'fill_rate': fill_rate,
+            'mean_backlog': self.backlog_sum / ticks,
+            'mean_inventory': self.inventory_sum / ticks,
+            'mean_in_transit': self.in_transit_sum / ticks,
+        }
@@ -0,0 +1,58 @@
+# Import-time benchmark and guard for the simulation modules
+# Imports each module in a fresh interpreter, reports the median import time
+# and fails (exit code 1) if a heavy optional dependency gets imported or the
+# time exceeds --max-seconds.
+#
+# Run with: python bench_import.py
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ['multi_node_simulation', 'main', 'sweep', 'run_multi_node']
+# Must not be imported just by importing the modules above
+FORBIDDEN = ['pandas', 'streamlit', 'matplotlib']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+def measure(module, repeat):
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    loaded = set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, forbidden=FORBIDDEN)],
+                             cwd=here, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result['seconds'])
+        loaded.update(result['loaded'])
+    return statistics.median(times), sorted(loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the simulation modules")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="Budget for the median import time of each module")
+    args = parser.parse_args()
+    failed = False
+    for module in MODULES:
+        seconds, loaded = measure(module, args.repeat)
+        status = "ok"
+        if loaded:
+            status = f"FAIL: imported {', '.join(loaded)}"
+            failed = True
+        elif seconds > args.max_seconds:
+            status = f"FAIL: over {args.max_seconds:.2f}s"
+            failed = True
+        print(f"{module:24s} {seconds*1000:8.1f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# Incrementally updated chart data for the Streamlit dashboards
+# Series and histograms are updated once per step in O(1) and keep a bounded
+# amount of state, so drawing them costs the same after 100 or 100k ticks.
+# pandas is imported inside the DataFrame helpers only, like metrics_logger.
+
+import numpy as np
+
+class DownsampledSeries:
+    def __init__(self, max_buckets=250):
+        """
+        A time series kept as at most `max_buckets` buckets of consecutive
+        points. Each bucket remembers its first, last, min and max point
+        (M4 aggregation), which is enough to draw the same line as the raw
+        data at chart resolution. When the buckets run out, neighbours are
+        merged pairwise and the bucket width doubles.
+        """
+        if max_buckets < 2 or max_buckets % 2:
+            raise ValueError("max_buckets must be an even number >= 2")
+        self.max_buckets = max_buckets
+        self.width = 1  # Raw points per bucket
+        self.count = 0  # Raw points appended
+        self._fill = 0  # Raw points in the last bucket
+        # Each bucket: [first_x, first_y, last_x, last_y, min_x, min_y, max_x, max_y]
+        self.buckets = []
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x, y):
+        if y is None:
+            return
+        self.count += 1
+        if self.buckets and self._fill < self.width:
+            bucket = self.buckets[-1]
+            bucket[2] = x
+            bucket[3] = y
+            if y < bucket[5]:
+                bucket[4] = x
+                bucket[5] = y
+            if y > bucket[7]:
+                bucket[6] = x
+                bucket[7] = y
+            self._fill += 1
+            return
+        if len(self.buckets) == self.max_buckets:
+            self._merge()
+        self.buckets.append([x, y, x, y, x, y, x, y])
+        self._fill = 1
+
+    def _merge(self):
+        # All buckets are full here, so every merged bucket is full too
+        merged = []
+        for a, b in zip(self.buckets[0::2], self.buckets[1::2]):
+            low = a if a[5] <= b[5] else b
+            high = a if a[7] >= b[7] else b
+            merged.append([a[0], a[1], b[2], b[3], low[4], low[5], high[6], high[7]])
+        self.buckets = merged
+        self.width *= 2
+
+    def points(self):
+        """Returns (x, y) NumPy arrays of at most 4 * max_buckets points in x order."""
+        if not self.buckets:
+            return np.empty(0), np.empty(0)
+        raw = np.array(self.buckets, dtype=float).reshape(-1, 4, 2)
+        # Order each bucket's four points by x; drop repeats of the same point
+        order = np.argsort(raw[:, :, 0], axis=1, kind='stable')
+        raw = np.take_along_axis(raw, order[:, :, None], axis=1).reshape(-1, 2)
+        keep = np.ones(len(raw), dtype=bool)
+        keep[1:] = raw[1:, 0] != raw[:-1, 0]
+        return raw[keep, 0], raw[keep, 1]
+
+def series_frame(series, x_name='time'):
+    """
+    Long-format DataFrame (x_name, 'series', 'value') of a {name:
+    DownsampledSeries} dict, to draw with line_chart_spec(x_name).
+    """
+    import pandas as pd
+    frames = []
+    for name, s in series.items():
+        x, y = s.points()
+        frames.append(pd.DataFrame({x_name: x, 'series': name, 'value': y}))
+    if not frames:
+        return pd.DataFrame(columns=[x_name, 'series', 'value'])
+    return pd.concat(frames, ignore_index=True)
+
+class RunningStats:
+    """Count, sum, min, max and last value of a stream, updated in O(1) per value."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, value):
+        if value is None:
+            return
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+# Plain Vega-Lite specs for st.vega_lite_chart. Building charts through
+# st.line_chart/st.bar_chart validates an Altair spec on every call, which
+# costs far more than drawing the bounded data itself.
+
+def line_chart_spec(x_name='time', y_title=None):
+    """Spec drawing a series_frame() DataFrame, one colored line per series."""
+    return {
+        'mark': {'type': 'line', 'interpolate': 'linear'},
+        'encoding': {
+            'x': {'field': x_name, 'type': 'quantitative'},
+            'y': {'field': 'value', 'type': 'quantitative', 'title': y_title},
+            'color': {'field': 'series', 'type': 'nominal', 'title': None},
+        },
+    }
+
+def histogram_spec(x_title=None):
+    """Spec drawing a StreamingHistogram.to_frame() (reset_index()) DataFrame."""
+    return {
+        'mark': 'bar',
+        'encoding': {
+            'x': {'field': 'bin', 'type': 'ordinal', 'title': x_title},
+            'y': {'field': 'count', 'type': 'quantitative'},
+        },
+    }
+
+class StreamingHistogram:
+    def __init__(self, max_bins=40, start=0):
+        """
+        Bin counts of a stream of values >= start, updated per value. Bins
+        have integer width, starting at 1; when a value falls past the last
+        of `max_bins` bins, neighbouring bins are merged pairwise and the
+        width doubles. Values below start are counted in the first bin.
+        """
+        if max_bins < 2 or max_bins % 2:
+            raise ValueError("max_bins must be an even number >= 2")
+        self.max_bins = max_bins
+        self.start = start
+        self.width = 1
+        self.counts = [0] * max_bins
+        self.total = 0
+
+    def add(self, value):
+        if value is None:
+            return
+        index = max(0, int((value - self.start) // self.width))
+        while index >= self.max_bins:
+            self.counts = [a + b for a, b in zip(self.counts[0::2], self.counts[1::2])] + [0] * (self.max_bins // 2)
+            self.width *= 2
+            index = int((value - self.start) // self.width)
+        self.counts[index] += 1
+        self.total += 1
+
+    def edges(self):
+        """Left edge of every bin."""
+        return [self.start + i * self.width for i in range(self.max_bins)]
+
+    def to_frame(self):
+        """DataFrame of the bins up to the last non-empty one, indexed by left edge."""
+        import pandas as pd
+        used = max((i for i, c in enumerate(self.counts) if c), default=-1) + 1
+        return pd.DataFrame({'count': self.counts[:used]}, index=pd.Index(self.edges()[:used], name='bin'))
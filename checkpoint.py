@@ -0,0 +1,17 @@
+# Checkpoint helpers shared by the simulators
+# A checkpoint is the pickled simulation object compressed with zlib. Only
+# restore checkpoints you created yourself: unpickling runs arbitrary code.
+
+import pickle
+import zlib
+
+def dumps(obj):
+    """Returns a compact binary checkpoint of `obj`."""
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+def loads(data, cls):
+    """Restores a checkpoint made by dumps() and checks it holds a `cls`."""
+    obj = pickle.loads(zlib.decompress(data))
+    if not isinstance(obj, cls):
+        raise TypeError(f"Checkpoint holds a {type(obj).__name__}, expected {cls.__name__}")
+    return obj
@@ -2,9 +2,15 @@
 # Modular, well-commented code for easy understanding and extension
 # Author: GitHub Copilot
 
-import random
+import itertools
+import json
+import os
+import uuid
 from collections import deque
 
+from random_streams import RandomStreams
+import checkpoint
+
 # -----------------------------
 # Customer class
 # -----------------------------
@@ -55,9 +61,11 @@ class ProductQueue:
 		Each entry: (arrival_time, quantity)
 		"""
 		self.queue = deque()
+		self.total_quantity = 0  # Running sum of quantities in the queue
 
 	def add_shipment(self, arrival_time, quantity):
 		self.queue.append((arrival_time, quantity))
+		self.total_quantity += quantity
 
 	def pop_ready_shipments(self, current_time):
 		"""
@@ -66,11 +74,13 @@ class ProductQueue:
 		"""
 		ready = []
 		while self.queue and self.queue[0][0] <= current_time:
-			ready.append(self.queue.popleft())
+			shipment = self.queue.popleft()
+			self.total_quantity -= shipment[1]
+			ready.append(shipment)
 		return ready
 
 	def queue_size(self):
-		return sum(q for _, q in self.queue)
+		return self.total_quantity
 
 	def quantity_in_front_of_last(self):
 		"""
@@ -79,7 +89,7 @@ class ProductQueue:
 		"""
 		if len(self.queue) <= 1:
 			return 0
-		return sum(q for _, q in list(self.queue)[:-1])
+		return self.total_quantity - self.queue[-1][1]
 
 # -----------------------------
 # CustomerQueue class
@@ -90,13 +100,17 @@ class CustomerQueue:
 		FIFO queue for waiting customers.
 		"""
 		self.queue = deque()
+		self.total_demand = 0  # Running sum of demands in the queue
 
 	def add_customer(self, customer):
 		self.queue.append(customer)
+		self.total_demand += customer.demand
 
 	def pop_customer(self):
 		if self.queue:
-			return self.queue.popleft()
+			customer = self.queue.popleft()
+			self.total_demand -= customer.demand
+			return customer
 		return None
 
 	def is_empty(self):
@@ -112,7 +126,7 @@ class CustomerQueue:
 		"""
 		if len(self.queue) <= 1:
 			return 0
-		return sum(c.demand for c in list(self.queue)[:-1])
+		return self.total_demand - self.queue[-1].demand
 
 # -----------------------------
 # Shop class
@@ -181,15 +195,198 @@ class Shop:
 				break
 		return 'idle'
 
+# -----------------------------
+# Stats sinks
+# -----------------------------
+class SummaryStatsSink:
+	def __init__(self):
+		"""
+		Receives the state dict of every step and keeps only constant-size
+		summary counters. Subclasses also retain states for iteration.
+		"""
+		self.reset_summary()
+
+	def reset_summary(self):
+		self.steps = 0
+		self.customers = 0
+		self.total_demand = 0
+		self.inventory_total = 0
+		self.product_queue_total = 0
+		self.customer_queue_total = 0
+		self.max_customer_queue = 0
+		self.last = None  # Most recent state
+
+	def append(self, state):
+		self.steps += 1
+		if state['customer_arrived']:
+			self.customers += 1
+			self.total_demand += state['customer_demand']
+		self.inventory_total += state['inventory']
+		self.product_queue_total += state['product_queue_size']
+		self.customer_queue_total += state['customer_queue_size']
+		self.max_customer_queue = max(self.max_customer_queue, state['customer_queue_size'])
+		self.last = state
+		self.store(state)
+
+	def store(self, state):
+		pass
+
+	def clear(self):
+		self.reset_summary()
+
+	def close(self):
+		pass
+
+	def __iter__(self):
+		return iter(())
+
+	def __len__(self):
+		return 0
+
+	def summary(self):
+		"""
+		Returns the counters and per-step averages over all steps seen.
+		"""
+		steps = max(self.steps, 1)
+		return {
+			'steps': self.steps,
+			'customers': self.customers,
+			'total_demand': self.total_demand,
+			'avg_inventory': self.inventory_total / steps,
+			'avg_product_queue_size': self.product_queue_total / steps,
+			'avg_customer_queue_size': self.customer_queue_total / steps,
+			'max_customer_queue_size': self.max_customer_queue,
+		}
+
+class ListStatsSink(SummaryStatsSink):
+	def __init__(self):
+		"""
+		Keeps every state in memory (the default).
+		"""
+		self.states = []
+		super().__init__()
+
+	def store(self, state):
+		self.states.append(state)
+
+	def clear(self):
+		super().clear()
+		self.states = []
+
+	def __iter__(self):
+		return iter(self.states)
+
+	def __len__(self):
+		return len(self.states)
+
+class RingBufferStatsSink(SummaryStatsSink):
+	def __init__(self, maxlen=1000):
+		"""
+		Keeps only the last `maxlen` states.
+		"""
+		self.states = deque(maxlen=maxlen)
+		super().__init__()
+
+	def store(self, state):
+		self.states.append(state)
+
+	def clear(self):
+		super().clear()
+		self.states.clear()
+
+	def __iter__(self):
+		return iter(self.states)
+
+	def __len__(self):
+		return len(self.states)
+
+class JsonLinesStatsSink(SummaryStatsSink):
+	def __init__(self, path, append=False):
+		"""
+		Streams every state to an append-only JSON Lines file and reads them
+		back on iteration. Tuples come back as lists. With append=True the
+		lines already in the file are kept: they count towards len() and are
+		iterated first, and clear() only drops the states written after them.
+		A sink restored from a checkpoint (e.g. a forked Simulation) writes
+		to its own file, named <path stem>.<random id><ext>, which starts
+		with a copy of this sink's states only (not the lines it appended
+		to). That file stays open until close() and is never removed.
+		"""
+		self.path = path
+		# Lines and bytes already in the file before this sink's states
+		self.start = 0
+		self.offset = 0
+		if append and os.path.exists(path):
+			with open(path, 'rb') as f:
+				self.start = sum(1 for _ in f)
+				self.offset = f.tell()
+		self.file = open(path, 'a' if append else 'w')
+		self.count = self.start
+		super().__init__()
+
+	def store(self, state):
+		self.file.write(json.dumps(state) + "\n")
+		self.count += 1
+
+	def clear(self):
+		super().clear()
+		self.file.seek(self.offset)
+		self.file.truncate()
+		self.count = self.start
+
+	def close(self):
+		self.file.close()
+
+	def __getstate__(self):
+		# Checkpoints keep the path and the number of states written so far
+		self.file.flush()
+		state = self.__dict__.copy()
+		del state['file']
+		return state
+
+	def __setstate__(self, state):
+		# A restored (or forked) sink never writes to the original file: it
+		# continues in a copy of the states this sink wrote, at a new path
+		self.__dict__.update(state)
+		source = self.path
+		expected = self.count - self.start
+		root, ext = os.path.splitext(source)
+		self.path = f"{root}.{uuid.uuid4().hex[:8]}{ext}"
+		copied = 0
+		with open(source, 'rb') as src, open(self.path, 'wb') as dst:
+			src.seek(self.offset)
+			for line in itertools.islice(src, expected):
+				dst.write(line)
+				copied += 1
+		if copied < expected:
+			os.remove(self.path)
+			raise ValueError(f"{source} holds {copied} states, the checkpoint expects {expected}")
+		self.start = 0
+		self.offset = 0
+		self.count = copied
+		self.file = open(self.path, 'a')
+
+	def __iter__(self):
+		self.file.flush()
+		with open(self.path, 'r') as f:
+			for line in f:
+				yield json.loads(line)
+
+	def __len__(self):
+		return self.count
+
 # -----------------------------
 # Simulation class
 # -----------------------------
 
 # Refactored Simulation class for step-by-step execution
 class Simulation:
-	def __init__(self, max_inventory=10, lead_time=3, max_time=100, max_customer_interval=5, min_demand=1, max_demand=5, seed=None):
+	def __init__(self, max_inventory=10, lead_time=3, max_time=100, max_customer_interval=5, min_demand=1, max_demand=5, seed=None, stats_sink=None):
 		"""
 		Step-by-step supply chain simulation for interactive visualization.
+		stats_sink receives the state of every step (default: ListStatsSink,
+		which keeps them all); use RingBufferStatsSink, JsonLinesStatsSink or
+		SummaryStatsSink to bound memory on long runs.
 		"""
 		self.max_inventory = max_inventory
 		self.lead_time = lead_time
@@ -200,12 +397,17 @@ class Simulation:
 		self.shop = Shop(max_inventory, lead_time)
 		self.time = 0
 		self.next_customer_time = 0
-		self.stats = []  # Collect stats for analysis
+		self.stats = stats_sink if stats_sink is not None else ListStatsSink()  # Collect stats for analysis
 		self.last_customer = None  # Track last customer arrival and demand
 		self.last_customer_arrived = False
-		self.orders_with_manufacturer = []  # List of (sent_time, quantity)
-		if seed is not None:
-			random.seed(seed)
+		# Orders in transit, oldest first: {'order_time', 'arrival_time', 'quantity'}.
+		# arrival_time = order_time + lead_time, so arrivals are in order too.
+		self.orders_with_manufacturer = deque()
+		# Own random streams (no global random.seed), one per stochastic input
+		self.seed = seed
+		self.random_streams = RandomStreams(seed)
+		self.demand_rng = self.random_streams.get('demand')
+		self.interarrival_rng = self.random_streams.get('inter_arrival')
 
 	def step(self):
 		"""
@@ -220,13 +422,9 @@ class Simulation:
 		incoming = sum(q for _, q in shipments)
 		self.shop.inventory.add(incoming)
 
-		# Remove arrived shipments from orders_with_manufacturer
-		def order_arrival_time(order):
-			if isinstance(order, dict):
-				return order['arrival_time']
-			else:
-				return order[0]
-		self.orders_with_manufacturer = [order for order in self.orders_with_manufacturer if order_arrival_time(order) > t]
+		# Remove arrived shipments from the front of orders_with_manufacturer
+		while self.orders_with_manufacturer and self.orders_with_manufacturer[0]['arrival_time'] <= t:
+			self.orders_with_manufacturer.popleft()
 
 		# 2. Process waiting customers (if any)
 		consumed = 0
@@ -252,7 +450,7 @@ class Simulation:
 		customer_arrived = False
 		customer_demand = None
 		if t >= self.next_customer_time:
-			demand = random.randint(self.min_demand, self.max_demand)
+			demand = self.demand_rng.randint(self.min_demand, self.max_demand)
 			customer = Customer(arrival_time=t, demand=demand)
 			# Always place manufacturer order at demand time
 			self.shop.product_queue.add_shipment(t + self.lead_time, customer.demand)
@@ -273,7 +471,7 @@ class Simulation:
 				customer_arrived = True
 				customer_demand = demand
 			# Schedule next customer
-			interval = random.randint(1, self.max_customer_interval)
+			interval = self.interarrival_rng.randint(1, self.max_customer_interval)
 			self.next_customer_time = t + interval
 			self.last_customer = customer
 		else:
@@ -300,13 +498,6 @@ class Simulation:
 			'inventory_consumed': consumed,
 			'inventory_calc': f"{prev_inventory} + {incoming} - {consumed} = {self.shop.inventory.current}",
 		}
-		# Store history for histogram
-		if not hasattr(self, 'product_queue_in_front_of_last_hist'):
-			self.product_queue_in_front_of_last_hist = []
-		if not hasattr(self, 'customer_queue_in_front_of_last_hist'):
-			self.customer_queue_in_front_of_last_hist = []
-		self.product_queue_in_front_of_last_hist.append(product_queue_in_front_of_last)
-		self.customer_queue_in_front_of_last_hist.append(customer_queue_in_front_of_last)
 		self.stats.append(state)
 		self.time += 1
 		return state
@@ -318,17 +509,49 @@ class Simulation:
 		self.shop = Shop(self.max_inventory, self.lead_time)
 		self.time = 0
 		self.next_customer_time = 0
-		self.stats = []
+		self.stats.clear()
 		self.last_customer = None
 		self.last_customer_arrived = False
-		self.orders_with_manufacturer = []
+		self.orders_with_manufacturer.clear()
 
 	def is_finished(self):
 		return self.time >= self.max_time
 
+	def snapshot(self):
+		"""
+		Returns a compact binary checkpoint of the full simulation state
+		(shop queues, orders, stats, random streams and time). Restoring one
+		that uses a JsonLinesStatsSink creates a new stats file each time;
+		close() the restored simulation and remove that file when done.
+		"""
+		return checkpoint.dumps(self)
+
+	@classmethod
+	def restore(cls, data):
+		"""
+		Rebuilds a simulation from snapshot() output; it continues exactly as the original would.
+		"""
+		return checkpoint.loads(data, cls)
+
+	def fork(self):
+		"""
+		Returns an independent copy of the current state, e.g. to branch a what-if run.
+		Like restore(), this opens a new stats file for a JsonLinesStatsSink.
+		"""
+		return self.restore(self.snapshot())
+
+	def close(self):
+		"""
+		Closes the stats sink (e.g. the file of a JsonLinesStatsSink).
+		"""
+		self.stats.close()
+
 	def print_stats(self, every=10):
-		for stat in self.stats[::every]:
+		for i, stat in enumerate(self.stats):
+			if i % every:
+				continue
 			print(f"Time {stat['time']}: Inventory={stat['inventory']}, ProductQueue={stat['product_queue_size']} (front of last: {stat['product_queue_in_front_of_last']}), CustomerQueue={stat['customer_queue_size']} (front of last: {stat['customer_queue_in_front_of_last']})")
+		print(f"Summary: {self.stats.summary()}")
 
 # -----------------------------
 # Main entry point
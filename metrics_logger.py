@@ -1,21 +1,49 @@
-import pandas as pd
+# pandas is imported inside the DataFrame methods only, so importing this
+# module (and multi_node_simulation) stays cheap for workers and CLI runs.
+import numpy as np
 import json
 import os
 
-# Load config file for defaults
+from output_analysis import batch_means_ci, mser5
+
 config_path = os.path.join(os.path.dirname(__file__), "config.json")
-if os.path.exists(config_path):
-    with open(config_path, "r") as f:
-        config = json.load(f)
-else:
-    config = {}
+_config = None
+
+def get_config():
+    """Loads the config file for defaults on first use."""
+    global _config
+    if _config is None:
+        if os.path.exists(config_path):
+            with open(config_path, "r") as f:
+                _config = json.load(f)
+        else:
+            _config = {}
+    return _config
+
+# Sentinel stored in the metric arrays for "not set yet"
+UNSET = -1
+INITIAL_CAPACITY = 1024
 
 class MetricsLogger:
-    
-    def __init__(self, num_nodes):
+    """
+    Per-unit metrics stored column-wise: one growable NumPy int array per
+    column, one row per unit. Tuple-valued columns (arrive_at_node{i},
+    customer_delivered) are split into a time column and a `_requested`
+    column.
+
+    lag_times are the owning simulation's per-node shipping lags, used for the
+    node_i_to_node_{i+1} cycles. If not given they are read from config.json.
+    """
+
+    def __init__(self, num_nodes, lag_times=None):
         self.num_nodes = num_nodes
-        self.metrics = []  # List of dicts, one per unit
-        self.unit_id_to_idx = {}  # Map unit.id to row index in metrics
+        if lag_times is None:
+            lag_times = get_config().get("lag_times", [0]*num_nodes)
+        self.lag_times = list(lag_times)
+        self.unit_ids = []  # unit_id per row (formatted with str() on export)
+        self.unit_id_to_idx = {}  # Map str(unit.id) to row index, filled lazily
+        self.size = 0
+        self.capacity = INITIAL_CAPACITY
         # Build modular column names
         self.columns = ['unit_id', 'customer_request']
         for i in range(1, num_nodes+1):
@@ -23,84 +51,332 @@ class MetricsLogger:
             self.columns.append(f'arrive_at_node{i}')
         self.columns.append('manufacturing_completed')
         self.columns.append('customer_delivered')
+        # Columns holding a (time, requested_time) pair
+        self.tuple_columns = {f'arrive_at_node{i}' for i in range(1, num_nodes+1)}
+        self.tuple_columns.add('customer_delivered')
+        self.array_columns = []
+        for col in self.columns[1:]:
+            self.array_columns.append(col)
+            if col in self.tuple_columns:
+                self.array_columns.append(f'{col}_requested')
+        self.data = {col: np.full(self.capacity, UNSET, dtype=np.int32) for col in self.array_columns}
+        # O(1) column name -> column index; update()/set_value() accept either
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        # Per column index: storage array name, `_requested` array name (or
+        # None) and the node number for arrive_at_node{i} (0 otherwise)
+        self._time_col = [None] + self.columns[1:]
+        self._requested_col = [f'{col}_requested' if col in self.tuple_columns else None for col in self.columns]
+        self._arrive_node = [int(col[len('arrive_at_node'):]) if col.startswith('arrive_at_node') else 0 for col in self.columns]
+        self._delivered_col = self.column_index['customer_delivered']
+        # Indexed by node number i: arrive_at_node{i} index and node_i_to_node_{i+1} key
+        self._arrive_col = [None] + [self.column_index[f'arrive_at_node{i}'] for i in range(1, num_nodes+1)]
+        self._pair_key = [None] + [f'node_{i}_to_node_{i+1}_cycle' for i in range(1, num_nodes+1)]
         # Store average cycle times at each timestep
         self.cycle_time_history = []
+        # Running (sum, count) per cycle metric, kept up to date by update()
+        # so averages can be snapshotted without rebuilding a DataFrame.
+        self.cycle_sums = {}
+        self.cycle_counts = {}
+        for key in self.cycle_metric_names():
+            self.cycle_sums[key] = 0
+            self.cycle_counts[key] = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        # Checkpoints hold only the filled rows; the str(unit_id) index is rebuilt lazily
+        state = self.__dict__.copy()
+        state['data'] = {col: values[:self.size].copy() for col, values in self.data.items()}
+        state['unit_id_to_idx'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.capacity = max(INITIAL_CAPACITY, 2 * self.size)
+        for col, values in self.data.items():
+            self.data[col] = np.full(self.capacity, UNSET, dtype=values.dtype)
+            self.data[col][:self.size] = values
+
+    def reset(self, keep_rows=0):
+        """
+        Clears all metrics for a new replication, reusing the arrays. The
+        first keep_rows units stay registered (same handles) with only their
+        customer_request kept. The cycle time history is cleared too.
+        """
+        for col, values in self.data.items():
+            if col == 'customer_request':
+                values[keep_rows:self.size] = UNSET
+            else:
+                values[:self.size] = UNSET
+        del self.unit_ids[keep_rows:]
+        self.unit_id_to_idx.clear()
+        self.size = keep_rows
+        for key in self.cycle_sums:
+            self.cycle_sums[key] = 0
+            self.cycle_counts[key] = 0
+        self.cycle_time_history.clear()
+
+    def cycle_metric_names(self):
+        names = ['full_cycle', 'customer_node1_cycle']
+        for i in range(1, self.num_nodes):
+            names.append(f'node_{i}_to_node_{i+1}_cycle')
+        return names
+
+    def _grow(self):
+        self.capacity *= 2
+        for col, old in self.data.items():
+            new = np.full(self.capacity, UNSET, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            self.data[col] = new
 
     def add_unit(self, unit_id, customer_request_time):
-        unit_id_str = str(unit_id)
-        row = {col: None for col in self.columns}
-        row['unit_id'] = unit_id_str
-        row['customer_request'] = customer_request_time
-        self.unit_id_to_idx[unit_id_str] = len(self.metrics)
-        self.metrics.append(row)
+        """
+        Adds a row for the unit and returns its integer handle (the row index),
+        to be passed to set_value() instead of the unit id.
+        """
+        if self.size == self.capacity:
+            self._grow()
+        handle = self.size
+        self.unit_ids.append(unit_id)
+        if customer_request_time is not None:
+            self.data['customer_request'][handle] = customer_request_time
+        self.size += 1
+        return handle
+
+    def handle_for(self, unit_id):
+        """Returns the handle of a unit id (or its str() form), or None."""
+        # Index the rows added since the last string-keyed lookup
+        for idx in range(len(self.unit_id_to_idx), self.size):
+            self.unit_id_to_idx[str(self.unit_ids[idx])] = idx
+        return self.unit_id_to_idx.get(str(unit_id))
 
     def update(self, unit_id, column, value):
-        unit_id_str = str(unit_id)
-        idx = self.unit_id_to_idx.get(unit_id_str)
-        if idx is not None and column in self.columns:
-            self.metrics[idx][column] = value
+        """
+        String-keyed update by unit id. `column` may be a name or an index
+        from column_index. Unknown units or columns are ignored.
+        """
+        idx = self.handle_for(unit_id)
+        if isinstance(column, str):
+            column = self.column_index.get(column)
+        # Column 0 is unit_id, which is fixed at add_unit()
+        if idx is not None and column is not None and column > 0:
+            self.set_value(idx, column, value)
+
+    def set_value(self, handle, column, value):
+        """Writes `value` for the unit `handle` in column index `column`."""
+        requested_col = self._requested_col[column]
+        if requested_col is None:
+            self.data[self._time_col[column]][handle] = UNSET if value is None else value
+            return
+        # Retract the old contribution (if any) before overwriting
+        self._accumulate(handle, column, -1)
+        if isinstance(value, tuple):
+            self.data[self._time_col[column]][handle], self.data[requested_col][handle] = value
+        else:
+            self.data[self._time_col[column]][handle] = UNSET if value is None else value
+            self.data[requested_col][handle] = UNSET
+        self._accumulate(handle, column, 1)
+
+    def _pair(self, idx, column):
+        time = int(self.data[self._time_col[column]][idx])
+        requested = int(self.data[self._requested_col[column]][idx])
+        if time == UNSET or requested == UNSET:
+            return None
+        return time, requested
+
+    def _accumulate(self, idx, column, sign):
+        """
+        Add (sign=1) or remove (sign=-1) the cycle time samples that depend on
+        column index `column` of this row. Mirrors the pairing rules of
+        compute_cycle_times. node_i_to_node_{i+1} sums exclude the lag time,
+        which is subtracted when averaging.
+        """
+        if column == self._delivered_col:
+            delivered = self._pair(idx, column)
+            if delivered is None:
+                return
+            self._add_sample('customer_node1_cycle', delivered[0] - delivered[1], sign)
+            request = int(self.data['customer_request'][idx])
+            if request != UNSET:
+                self._add_sample('full_cycle', delivered[0] - request, sign)
+            if self.num_nodes > 1:
+                arrive1 = self._pair(idx, self._arrive_col[1])
+                if arrive1 is not None:
+                    self._add_sample(self._pair_key[1], delivered[0] - arrive1[1], sign)
+            return
+
+        i = self._arrive_node[column]
+        arrive_i = self._pair(idx, column)
+        if arrive_i is None:
+            return
+        # As the upstream end of node_i_to_node_{i+1}
+        if i < self.num_nodes:
+            if i == 1:
+                delivered = self._pair(idx, self._delivered_col)
+                if delivered is not None:
+                    self._add_sample(self._pair_key[1], delivered[0] - arrive_i[1], sign)
+            else:
+                downstream = self._pair(idx, self._arrive_col[i-1])
+                if downstream is not None:
+                    self._add_sample(self._pair_key[i], downstream[0] - arrive_i[1], sign)
+        # As the downstream end of node_{i+1}_to_node_{i+2}
+        if 2 <= i + 1 < self.num_nodes:
+            upstream = self._pair(idx, self._arrive_col[i+1])
+            if upstream is not None:
+                self._add_sample(self._pair_key[i+1], arrive_i[0] - upstream[1], sign)
+
+    def _add_sample(self, key, value, sign):
+        self.cycle_sums[key] += sign * value
+        self.cycle_counts[key] += sign
+
+    def average_cycle_times(self):
+        """
+        Returns the current average of each cycle metric (None if no samples)
+        from the running sums, in O(num_nodes). Same values as the averages
+        computed by compute_cycle_times.
+        """
+        lag_times = self.lag_times
+        averages = {}
+        for key in self.cycle_metric_names():
+            count = self.cycle_counts[key]
+            if not count:
+                averages[key] = None
+                continue
+            total = self.cycle_sums[key]
+            if key.startswith('node_') and not key.startswith('node_1_'):
+                i = int(key.split('_')[1])
+                total -= lag_times[i-1] * count
+            averages[key] = total / count
+        return averages
 
-    def to_dataframe(self):
-        return pd.DataFrame(self.metrics, columns=self.columns)
+    def snapshot_cycle_times(self, save_history=True):
+        """
+        Incremental counterpart of compute_cycle_times: returns the average
+        cycle times and, if save_history is True, appends them to the history.
+        """
+        averages = self.average_cycle_times()
+        if save_history:
+            self.cycle_time_history.append(averages)
+        return averages
+
+    def column_array(self, column):
+        """Returns the filled part of a storage column (a view, not a copy)."""
+        return self.data[column][:self.size]
+
+    def is_set(self, column):
+        """Boolean mask of rows where `column` has been written."""
+        values = self.column_array(column)
+        mask = values != UNSET
+        if column in self.tuple_columns:
+            mask &= self.column_array(f'{column}_requested') != UNSET
+        return mask
+
+    def to_columns(self):
+        """Returns {column: list} with None for unset values, without pandas."""
+        data = {'unit_id': [str(unit_id) for unit_id in self.unit_ids]}
+        for col in self.array_columns:
+            data[col] = [None if v == UNSET else v for v in self.column_array(col).tolist()]
+        return data
+
+    def select_rows(self, node=None, start=None, end=None, undelivered=False):
+        """
+        Returns the row indices (ascending) matching every given filter: units
+        that arrived at node number `node`, units whose customer_request lies
+        in [start, end], and units not yet delivered to the customer.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if node is not None:
+            mask &= self.is_set(f'arrive_at_node{node}')
+        if start is not None or end is not None:
+            requests = self.column_array('customer_request')
+            mask &= requests != UNSET
+            if start is not None:
+                mask &= requests >= start
+            if end is not None:
+                mask &= requests <= end
+        if undelivered:
+            mask &= ~self.is_set('customer_delivered')
+        return np.flatnonzero(mask)
+
+    def to_dataframe(self, rows=None):
+        """
+        Returns the metrics as a DataFrame of nullable integer columns. If
+        `rows` (row indices, e.g. a page of select_rows) is given, only those
+        rows are materialized and the index holds their row numbers.
+        """
+        import pandas as pd
+        # Wrap the arrays as nullable integer columns; only the masks are new
+        if rows is None:
+            unit_ids = self.unit_ids
+            index = None
+        else:
+            unit_ids = [self.unit_ids[row] for row in rows]
+            index = pd.Index(rows)
+        data = {'unit_id': [str(unit_id) for unit_id in unit_ids]}
+        for col in self.array_columns:
+            values = self.column_array(col)
+            if rows is not None:
+                values = values[rows]
+            data[col] = pd.arrays.IntegerArray(values, values == UNSET)
+        return pd.DataFrame(data, columns=['unit_id'] + self.array_columns, index=index)
 
     def to_csv(self, path):
         df = self.to_dataframe()
         df.to_csv(path, index=False)
 
-    def compute_cycle_times(self, save_history=True):
+    def cycle_samples(self):
         """
-        Returns a dictionary with cycle time lists for:
-        - 'customer_node1_cycle': time from customer request to delivery (customer_delivered - customer_request)
-        - 'full_cycle': time from customer request to final delivery (customer_delivered - customer_request)
-        - 'node_pair_cycles': list of cycle times for each node_i to node_{i+1} (arrive_at_node_{i+1} - arrive_at_node_{i})
-        If save_history is True, appends the current average cycle times to the history.
+        Returns {metric: (completion_times, cycle_times)} as NumPy arrays in row
+        order. The completion time is the tick the cycle ended at: the
+        customer delivery for full_cycle, customer_node1_cycle and
+        node_1_to_node_2_cycle, and the arrival at node i-1 for
+        node_i_to_node_{i+1}_cycle.
         """
-        df = self.to_dataframe().copy()
-        # Customer to node1 cycle times: difference between consecutive customer_delivered times
-        # If customer_delivered is a tuple, extract both values and compute their difference
-        delivered_tuples = [t for t in df['customer_delivered'].dropna().tolist() if isinstance(t, tuple)]
-        customer_node1_cycle = [t[0] - t[1] for t in delivered_tuples if isinstance(t, tuple) and len(t) == 2]
-        # Full cycle times: difference between customer_request and first value in customer_delivered tuple
-        full_cycle = [
-            delivered[0] - request
-            for request, delivered in zip(df['customer_request'], df['customer_delivered'])
-            if pd.notna(request) and pd.notna(delivered) and isinstance(delivered, tuple)
-        ]
-        # Node pair cycles (original implementation)
-        # node_pair_cycles = {}
-        # for i in range(1, self.num_nodes):
-        #     col = f'arrive_at_node{i}'
-        #     cycles = []
-        #     for val in df[col]:
-        #         if pd.notna(val) and isinstance(val, tuple) and len(val) == 2:
-        #             cycles.append(val[0] - val[1])
-        #     node_pair_cycles[f'node_{i}_to_node_{i+1}_cycle'] = cycles
-
-        # New node pair cycles calculation as requested
-        
-        node_pair_cycles = {}
+        delivered = self.is_set('customer_delivered')
+        delivered_time = self.column_array('customer_delivered')
+        request = self.column_array('customer_request')
+        samples = {}
+        # Full cycle times: delivery time minus customer_request (initial inventory has no request)
+        has_request = delivered & (request != UNSET)
+        samples['full_cycle'] = (delivered_time[has_request], (delivered_time - request)[has_request])
+        # Customer to node1 cycle times: delivery time minus the time node 1 was asked for the unit
+        samples['customer_node1_cycle'] = (delivered_time[delivered], (delivered_time - self.column_array('customer_delivered_requested'))[delivered])
         for i in range(1, self.num_nodes):
             col = f'arrive_at_node{i}'
-            cycles = []
+            arrived = self.is_set(col)
+            requested = self.column_array(f'{col}_requested')
             if i == 1:
                 # node_1_to_node2: use arrive_at_node1 and customer_delivered tuple
-                for arrive_val, delivered_val in zip(df[col], df['customer_delivered']):
-                    if pd.notna(arrive_val) and pd.notna(delivered_val) and isinstance(delivered_val, tuple) and len(delivered_val) == 2 and isinstance(arrive_val, tuple) and len(arrive_val) == 2:
-                        cycles.append(delivered_val[0] - arrive_val[1])
-                
+                mask = arrived & delivered
+                end_time = delivered_time
+                cycles = delivered_time - requested
             else:
                 # node_i_to_node_{i+1}: use arrive_at_node{i} and arrive_at_node{i-1}
                 col_downstream = f'arrive_at_node{i-1}'
-                for arrive_i, arrive_downstream in zip(df[col], df[col_downstream]):
-                    if pd.notna(arrive_i) and pd.notna(arrive_downstream) and isinstance(arrive_downstream, tuple) and len(arrive_downstream) == 2 and isinstance(arrive_i, tuple) and len(arrive_i) == 2:
-                        arrive_downstream_time = arrive_downstream[0]
-                        # lag time between node i and i-1 is in config file lag_time[i-1]
-                        lag_time_interest = config.get("lag_times", [0]*self.num_nodes)[i-1]
-                        left_current_time = arrive_downstream_time - lag_time_interest
-                        request_time = arrive_i[1]
-                        cycles.append(left_current_time - request_time)
-            node_pair_cycles[f'node_{i}_to_node_{i+1}_cycle'] = cycles
-            # print(f"Node {i} to Node {i+1} cycles: {cycles}")
+                mask = arrived & self.is_set(col_downstream)
+                end_time = self.column_array(col_downstream)
+                # lag time between node i and i-1 is lag_times[i-1]
+                left_current_time = end_time - self.lag_times[i-1]
+                cycles = left_current_time - requested
+            samples[f'node_{i}_to_node_{i+1}_cycle'] = (end_time[mask], cycles[mask])
+        return samples
+
+    def compute_cycle_times(self, save_history=True, warmup=0):
+        """
+        Returns a dictionary with cycle time lists for:
+        - 'customer_node1_cycle': time from customer request to delivery (customer_delivered - customer_request)
+        - 'full_cycle': time from customer request to final delivery (customer_delivered - customer_request)
+        - 'node_pair_cycles': list of cycle times for each node_i to node_{i+1} (arrive_at_node_{i+1} - arrive_at_node_{i})
+        Cycles completed before tick `warmup` are left out (see cycle_samples).
+        If save_history is True, appends the current average cycle times to the history.
+        """
+        cycles = {}
+        for metric, (end_time, values) in self.cycle_samples().items():
+            cycles[metric] = values[end_time >= warmup].tolist() if warmup else values.tolist()
+        customer_node1_cycle = cycles.pop('customer_node1_cycle')
+        full_cycle = cycles.pop('full_cycle')
+        node_pair_cycles = cycles
 
         # Compute averages
         avg_customer_node1 = sum(customer_node1_cycle)/len(customer_node1_cycle) if customer_node1_cycle else None
@@ -119,20 +395,52 @@ class MetricsLogger:
             'node_pair_cycles': node_pair_cycles
         }
 
-    def get_cycle_time_history(self):
+    def cycle_time_series(self, metric='full_cycle'):
+        """
+        Returns (ticks, means): the mean `metric` over the cycles completed at
+        each tick, for the ticks where at least one completed.
+        """
+        end_time, values = self.cycle_samples()[metric]
+        if len(end_time) == 0:
+            return np.array([], dtype=np.int64), np.array([])
+        counts = np.bincount(end_time)
+        sums = np.bincount(end_time, weights=values)
+        ticks = np.nonzero(counts)[0]
+        return ticks, sums[ticks] / counts[ticks]
+
+    def steady_state_estimate(self, metric='full_cycle', warmup='mser5', n_batches=20, confidence=0.95):
+        """
+        Estimates the steady-state mean of `metric` from its per-tick series.
+        warmup is a tick cutoff or 'mser5' to detect it with MSER-5. Returns
+        {'warmup', 'mean', 'half_width', 'ticks'}; half_width is the batch-means
+        confidence interval half-width (None with too few ticks).
+        """
+        ticks, means = self.cycle_time_series(metric)
+        if warmup == 'mser5':
+            drop = mser5(means)
+            warmup = int(ticks[drop]) if drop < len(ticks) else 0
+        kept = means[ticks >= warmup]
+        mean, half_width = batch_means_ci(kept, n_batches=n_batches, confidence=confidence)
+        return {'warmup': warmup, 'mean': mean, 'half_width': half_width, 'ticks': len(kept)}
+
+    def get_cycle_time_history(self, start=None, stop=None):
         """
         Returns a DataFrame of the average cycle times at each timestep, with columns ordered as:
         full_cycle, customer_node1_cycle, node_1_to_node_2_cycle, node_2_to_node_3_cycle, ...
+        If start/stop are given only the rows history[start:stop] are built;
+        the index holds their positions in the history.
         """
-        if not self.cycle_time_history:
+        import pandas as pd
+        rows = self.cycle_time_history[start:stop]
+        if not rows:
             return pd.DataFrame()
         # Ensure all keys are present in all rows
         all_keys = set()
-        for row in self.cycle_time_history:
+        for row in rows:
             all_keys.update(row.keys())
         # Fill missing keys with None
         filled_history = []
-        for row in self.cycle_time_history:
+        for row in rows:
             filled_row = {k: row.get(k, None) for k in all_keys}
             filled_history.append(filled_row)
         
@@ -144,7 +452,8 @@ class MetricsLogger:
         for k in all_keys:
             if k not in col_order:
                 col_order.append(k)
-        df = pd.DataFrame(filled_history)
+        first = range(len(self.cycle_time_history))[start:stop].start
+        df = pd.DataFrame(filled_history, index=pd.RangeIndex(first, first + len(rows)))
         # Only keep columns that exist in the DataFrame
         col_order = [c for c in col_order if c in df.columns]
         return df[col_order]
\ No newline at end of file
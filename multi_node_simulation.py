@@ -4,25 +4,136 @@
 
 
 from collections import deque
-import random
-from metrics_logger import MetricsLogger
+import heapq
+import numpy as np
+from metrics_logger import MetricsLogger, UNSET
+from random_streams import RandomStreams
+import checkpoint
+
+TIMELINE_FIELDS = (
+    't_demand_actual_customer',
+    't_order_to_supplier',
+    't_order_arrived_at_supplier',
+    't_order_to_manufacturer',
+    't_order_arrived_at_manufacturer',
+    't_manufacturing_completed',
+    't_shipped_to_distributor',
+    't_arrived_at_distributor',
+    't_shipped_to_shop',
+    't_arrived_at_shop',
+    't_given_to_actual_customer',
+)
+TIMELINE_DTYPE = np.dtype([(field, np.int32) for field in TIMELINE_FIELDS])
+
+class TimelineStore:
+    """
+    Timelines of many TrackedUnits in one growable structured array, one row
+    per unit. UNSET marks a time that has not happened (None in the view).
+    """
+    def __init__(self, capacity=1024):
+        self._set_rows(np.full(capacity, UNSET, dtype=TIMELINE_DTYPE))
+        self.size = 0
+
+    def _set_rows(self, rows):
+        self.rows = rows
+        # Cached per-field views, so get/set avoid building one per call
+        self.fields = {field: rows[field] for field in TIMELINE_FIELDS}
+
+    def __getstate__(self):
+        # Only the filled rows; the per-field views are rebuilt on restore
+        return {'rows': self.rows[:self.size].copy(), 'size': self.size}
+
+    def __setstate__(self, state):
+        self.size = state['size']
+        rows = np.full(max(1, 2 * self.size), UNSET, dtype=TIMELINE_DTYPE)
+        rows[:self.size] = state['rows']
+        self._set_rows(rows)
+
+    def reset(self, keep_rows=0):
+        """
+        Forgets all rows after the first keep_rows and clears every time of
+        the kept rows except t_demand_actual_customer. The array is reused.
+        """
+        for field in TIMELINE_FIELDS[1:]:
+            self.fields[field][:self.size] = UNSET
+        self.fields[TIMELINE_FIELDS[0]][keep_rows:self.size] = UNSET
+        self.size = keep_rows
+
+    def add_row(self):
+        if self.size == len(self.rows):
+            rows = np.full(2 * len(self.rows), UNSET, dtype=TIMELINE_DTYPE)
+            rows[:self.size] = self.rows[:self.size]
+            self._set_rows(rows)
+        self.size += 1
+        return self.size - 1
+
+    def get(self, row, field):
+        value = int(self.fields[field][row])
+        return None if value == UNSET else value
+
+    def set(self, row, field, value):
+        self.fields[field][row] = UNSET if value is None else value
+
+class TimelineView:
+    """Dict-like view of one unit's row in a TimelineStore."""
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, field):
+        return self.store.get(self.row, field)
+
+    def __setitem__(self, field, value):
+        self.store.set(self.row, field, value)
+
+    def __iter__(self):
+        return iter(TIMELINE_FIELDS)
+
+    def __len__(self):
+        return len(TIMELINE_FIELDS)
+
+    def get(self, field, default=None):
+        value = self[field] if field in TIMELINE_DTYPE.names else None
+        return default if value is None else value
+
+    def keys(self):
+        return list(TIMELINE_FIELDS)
+
+    def items(self):
+        return [(field, self[field]) for field in TIMELINE_FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
 
 class TrackedUnit:
-    def __init__(self, unit_id, t_demand_actual_customer=None):
+    __slots__ = ('id', 'handle', 'timelines', 'row')
+
+    def __init__(self, unit_id, t_demand_actual_customer=None, handle=None, timelines=None):
         self.id = unit_id
-        self.timeline = {
-            't_demand_actual_customer': t_demand_actual_customer,
-            't_order_to_supplier': None,
-            't_order_arrived_at_supplier': None,
-            't_order_to_manufacturer': None,
-            't_order_arrived_at_manufacturer': None,
-            't_manufacturing_completed': None,
-            't_shipped_to_distributor': None,
-            't_arrived_at_distributor': None,
-            't_shipped_to_shop': None,
-            't_arrived_at_shop': None,
-            't_given_to_actual_customer': None
-        }
+        self.handle = handle  # Row handle in the MetricsLogger
+        # Timeline row in the simulation's shared store (a private one if none given)
+        self.timelines = timelines if timelines is not None else TimelineStore(capacity=1)
+        self.row = self.timelines.add_row()
+        if t_demand_actual_customer is not None:
+            self.timelines.set(self.row, 't_demand_actual_customer', t_demand_actual_customer)
+
+    @property
+    def timeline(self):
+        # A new view per access: for external readers. The simulation writes
+        # through self.timelines.set(self.row, ...) directly.
+        return TimelineView(self.timelines, self.row)
+
+class Batch:
+    # One manufacturing batch: units started together at `start`, done at `end`
+    __slots__ = ('start', 'end', 'units', 'requested_times')
+
+    def __init__(self, start, end, units, requested_times):
+        self.start = start
+        self.end = end
+        self.units = units
+        self.requested_times = requested_times
 
 class Node:
     def __init__(self, node_id, initial_inventory, order_comm_lag, lag_time, is_manufacturer=False, manufacturing_time=None):
@@ -30,22 +141,86 @@ class Node:
         self.inventory = initial_inventory
         self.order_comm_lag = order_comm_lag
         self.lag_time = lag_time
-        self.inventory_units = []  # List of TrackedUnit objects in inventory
+        self.inventory_units = deque()  # TrackedUnit objects in inventory (FIFO)
         self.customer_queue = deque()  # (arrival_time, qty, TrackedUnit)
         self.order_queue = deque()     # (order_time, qty, TrackedUnit)
-        self.incoming_shipments = deque()  # (arrival_time, TrackedUnit, sent_time)
+        self.incoming_shipments = deque()  # (arrival_time, TrackedUnit, sent_time, requested_time)
+        self.shipment_arrivals = deque()   # [arrival_time, units] cohorts of incoming_shipments
         self.incoming_orders = deque()     # (arrival_time, TrackedUnit, sent_time)
         self.outgoing_shipments = deque()  # (arrival_time, TrackedUnit, sent_time)
         self.is_manufacturer = is_manufacturer
         self.manufacturing_time = manufacturing_time
         self.production_queue = deque()  # (order_time, qty)
+        self.active_batches = deque()  # Batch objects in start order (end times non-decreasing)
         self.current_production_end = None
         self.current_production_qty = 0
         self.current_production_unit = None
         self.current_production_order = None
 
+    def reset(self, initial_inventory):
+        """
+        Empties every queue and pipeline in place (the containers are reused)
+        and sets the inventory count; the caller refills inventory_units.
+        """
+        self.inventory = initial_inventory
+        self.inventory_units.clear()
+        self.customer_queue.clear()
+        self.order_queue.clear()
+        self.incoming_shipments.clear()
+        self.shipment_arrivals.clear()
+        self.incoming_orders.clear()
+        self.outgoing_shipments.clear()
+        self.active_batches.clear()
+        self.production_queue.clear()
+        self.current_production_end = None
+        self.current_production_qty = 0
+        self.current_production_unit = None
+        self.current_production_order = None
+
+    # Unit counts reported in the simulation stats
+    def inventory_count(self):
+        return len(self.inventory_units)
+
+    def customer_queue_count(self):
+        return len(self.customer_queue)
+
+    def incoming_shipments_count(self):
+        return len(self.incoming_shipments)
+
+    def incoming_orders_count(self):
+        return len(self.incoming_orders)
+
+    @staticmethod
+    def _push(cohorts, time, qty):
+        # Merge with the last cohort when it has the same time
+        if cohorts and cohorts[-1][0] == time:
+            cohorts[-1][1] += qty
+        else:
+            cohorts.append([time, qty])
+
+    def add_incoming_shipment(self, arrival_time, unit, sent_time, requested_time):
+        # Shipments are sent with a fixed lag, so they arrive in the order they are added
+        self.incoming_shipments.append((arrival_time, unit, sent_time, requested_time))
+        self._push(self.shipment_arrivals, arrival_time, 1)
+
+    def in_transit_by_arrival(self):
+        """Returns [(arrival_time, units)] of the shipments in transit, in arrival order."""
+        return [(time, qty) for time, qty in self.shipment_arrivals]
+
+    def shipments_arriving_at(self, arrival_time):
+        """Returns the incoming_shipments entries due at arrival_time."""
+        shipments = []
+        for shipment in self.incoming_shipments:
+            if shipment[0] > arrival_time:
+                break
+            if shipment[0] == arrival_time:
+                shipments.append(shipment)
+        return shipments
+
     def receive_shipments(self, current_time):
         received_units = []
+        while self.shipment_arrivals and self.shipment_arrivals[0][0] <= current_time:
+            self.shipment_arrivals.popleft()
         while self.incoming_shipments and self.incoming_shipments[0][0] <= current_time:
             shipment = self.incoming_shipments.popleft()
             if len(shipment) == 4:
@@ -69,8 +244,8 @@ class Node:
     def propagate_order_upstream(self, t, unit, upstream_node, order_comm_lag):
         arrival_time = t + order_comm_lag
         upstream_node.incoming_orders.append((arrival_time, unit, t))
-        unit.timeline['t_order_to_supplier'] = t
-        unit.timeline['t_order_arrived_at_supplier'] = arrival_time
+        unit.timelines.set(unit.row, 't_order_to_supplier', t)
+        unit.timelines.set(unit.row, 't_order_arrived_at_supplier', arrival_time)
 
     def fulfill_customer_queue(self, t, downstream_node=None):
         # Fulfill as much demand as possible (FIFO)
@@ -78,32 +253,29 @@ class Node:
         while self.customer_queue and self.inventory_units:
             arrival_time, qty, unit, requested_time = self.customer_queue[0]
             self.customer_queue.popleft()
-            inv_unit = self.inventory_units.pop(0)
+            inv_unit = self.inventory_units.popleft()
             if downstream_node is not None:
                 # Ship to downstream node with lag
-                downstream_node.incoming_shipments.append((t + self.lag_time, inv_unit, t, requested_time))
+                downstream_node.add_incoming_shipment(t + self.lag_time, inv_unit, t, requested_time)
                 shipped_units.append((t + self.lag_time, inv_unit, t, requested_time))
             else:
                 # Node 1: hand to customer
-                inv_unit.timeline['t_given_to_actual_customer'] = t
+                inv_unit.timelines.set(inv_unit.row, 't_given_to_actual_customer', t)
                 shipped_units.append((t, inv_unit, t, requested_time))
         return shipped_units
 
     def process_manufacturing(self, t, downstream_node):
         # Parallel batch production: start a new batch as soon as a request is received, even if others are in progress
-        if not hasattr(self, 'active_batches'):
-            self.active_batches = []  # Each batch: dict with keys 'end', 'units', 'requested_times', 'start'
-
         completed_units = []
 
-        # 1. Check for completed batches and ship them
-        batches_to_ship = [batch for batch in self.active_batches if t >= batch['end']]
-        for batch in batches_to_ship:
-            for unit, requested_time in zip(batch['units'], batch['requested_times']):
-                unit.timeline['t_manufacturing_completed'] = batch['end']
-                downstream_node.incoming_shipments.append((batch['end'] + self.lag_time, unit, batch['end'], requested_time))
+        # 1. Ship completed batches. All batches take manufacturing_time, so
+        # they finish in start order and the completed ones are at the front.
+        while self.active_batches and t >= self.active_batches[0].end:
+            batch = self.active_batches.popleft()
+            for unit, requested_time in zip(batch.units, batch.requested_times):
+                unit.timelines.set(unit.row, 't_manufacturing_completed', batch.end)
+                downstream_node.add_incoming_shipment(batch.end + self.lag_time, unit, batch.end, requested_time)
                 completed_units.append(unit)
-            self.active_batches.remove(batch)
 
         # 2. Start new batches for all new arrivals (grouped by arrival time)
         while self.customer_queue:
@@ -115,28 +287,143 @@ class Node:
                 batch_units.append(unit)
                 batch_requested_times.append(requested_time)
             if batch_units:
-                batch = {
-                    'start': t,
-                    'end': t + self.manufacturing_time,
-                    'units': batch_units,
-                    'requested_times': batch_requested_times
-                }
-                self.active_batches.append(batch)
+                self.active_batches.append(Batch(t, t + self.manufacturing_time, batch_units, batch_requested_times))
 
         return completed_units
 
+class AggregateNode(Node):
+    """
+    Node for the quantity-aggregated mode: queues, shipments and batches hold
+    [time, quantity] cohorts instead of one entry per TrackedUnit, and the
+    inventory is a plain count in self.inventory.
+    customer_queue: [arrival_time, qty], incoming_shipments/incoming_orders:
+    [arrival_time, qty], active_batches: [end, qty].
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calendar = None  # Shared event heap, set by EventDrivenSimulation
+        self.reset_totals()
+
+    def reset(self, initial_inventory):
+        super().reset(initial_inventory)
+        self.reset_totals()
+
+    def reset_totals(self):
+        # Running unit totals of the cohort deques
+        self.customer_queue_total = 0
+        self.incoming_shipments_total = 0
+        self.incoming_orders_total = 0
+
+    def inventory_count(self):
+        return self.inventory
+
+    def customer_queue_count(self):
+        return self.customer_queue_total
+
+    def incoming_shipments_count(self):
+        return self.incoming_shipments_total
+
+    def incoming_orders_count(self):
+        return self.incoming_orders_total
+
+    def in_transit_by_arrival(self):
+        # The shipment cohorts are already grouped by arrival time
+        return [(time, qty) for time, qty in self.incoming_shipments]
+
+    def shipments_arriving_at(self, arrival_time):
+        # Cohorts carry no per-unit detail
+        return [tuple(cohort) for cohort in self.incoming_shipments if cohort[0] == arrival_time]
+
+    def _schedule(self, time):
+        if self.calendar is not None:
+            heapq.heappush(self.calendar, time)
+
+    def add_shipment(self, arrival_time, qty):
+        self._push(self.incoming_shipments, arrival_time, qty)
+        self.incoming_shipments_total += qty
+        self._schedule(arrival_time)
+
+    def add_order(self, arrival_time, qty):
+        self._push(self.incoming_orders, arrival_time, qty)
+        self.incoming_orders_total += qty
+        self._schedule(arrival_time)
+
+    def receive_shipments(self, current_time):
+        received = 0
+        while self.incoming_shipments and self.incoming_shipments[0][0] <= current_time:
+            received += self.incoming_shipments.popleft()[1]
+        self.incoming_shipments_total -= received
+        self.inventory += received
+        return received
+
+    def receive_orders(self, current_time):
+        received = 0
+        while self.incoming_orders and self.incoming_orders[0][0] <= current_time:
+            received += self.incoming_orders.popleft()[1]
+        self.incoming_orders_total -= received
+        return received
+
+    def add_to_customer_queue(self, t, qty):
+        if qty:
+            self._push(self.customer_queue, t, qty)
+            self.customer_queue_total += qty
+
+    def propagate_order_upstream(self, t, qty, upstream_node, order_comm_lag):
+        upstream_node.add_order(t + order_comm_lag, qty)
+
+    def fulfill_customer_queue(self, t, downstream_node=None):
+        # Fulfill as much demand as possible (FIFO), consuming head cohorts
+        shipped = min(self.customer_queue_total, self.inventory)
+        remaining = shipped
+        while remaining:
+            cohort = self.customer_queue[0]
+            if cohort[1] <= remaining:
+                remaining -= cohort[1]
+                self.customer_queue.popleft()
+            else:
+                cohort[1] -= remaining
+                remaining = 0
+        self.customer_queue_total -= shipped
+        self.inventory -= shipped
+        if downstream_node is not None and shipped:
+            downstream_node.add_shipment(t + self.lag_time, shipped)
+        return shipped
+
+    def process_manufacturing(self, t, downstream_node):
+        completed = 0
+        # 1. Ship completed batches (end times are non-decreasing)
+        while self.active_batches and t >= self.active_batches[0][0]:
+            end, qty = self.active_batches.popleft()
+            downstream_node.add_shipment(end + self.lag_time, qty)
+            completed += qty
+        # 2. Start one batch per arrival-time cohort
+        while self.customer_queue:
+            arrival_time, qty = self.customer_queue.popleft()
+            self.active_batches.append([t + self.manufacturing_time, qty])
+            self._schedule(t + self.manufacturing_time)
+        self.customer_queue_total = 0
+        return completed
+
 class MultiNodeSimulation:
-    def __init__(self, num_nodes, initial_inventories, order_comm_lags, lag_times, max_time=100, manufacturing_time=3, max_demand=50, seed=None):
+    def __init__(self, num_nodes, initial_inventories, order_comm_lags, lag_times, max_time=100, manufacturing_time=3, max_demand=50, seed=None, aggregate=False):
+        """
+        aggregate=True runs the quantity-aggregated mode: no TrackedUnit objects
+        or per-unit metrics, only (time, quantity) cohorts. stats and
+        get_results() match the unit-tracked mode for the same demand sequence.
+        """
         self.num_nodes = num_nodes
         self.initial_inventories = initial_inventories[:]
         assert num_nodes == len(initial_inventories) == len(order_comm_lags) == len(lag_times)
         self.manufacturing_time = manufacturing_time
         self.max_demand = max_demand
-        if seed is not None:
-            random.seed(seed)
+        # Own random streams (no global random.seed), one per stochastic input
         self.seed = seed
+        self.random_streams = RandomStreams(seed)
+        self.demand_rng = self.random_streams.get('demand')
+        self.aggregate = aggregate
+        node_cls = AggregateNode if aggregate else Node
         self.nodes = [
-            Node(i+1, initial_inventories[i], order_comm_lags[i], lag_times[i],
+            node_cls(i+1, initial_inventories[i], order_comm_lags[i], lag_times[i],
                  is_manufacturer=(i == num_nodes-1), manufacturing_time=manufacturing_time if i == num_nodes-1 else None)
             for i in range(num_nodes)
         ]
@@ -145,49 +432,79 @@ class MultiNodeSimulation:
         self.stats = []
         self.customer_demand_history = []
         self.tracked_units = []  # All TrackedUnit objects for analysis
+        self.timelines = TimelineStore()  # Timeline rows of all tracked units
 
         # Initialize metrics logger
-        self.metrics_logger = MetricsLogger(num_nodes)
+        self.metrics_logger = MetricsLogger(num_nodes, lag_times=lag_times)
+        # Precomputed column indices for the per-unit logging calls in step()
+        column_index = self.metrics_logger.column_index
+        self.col_order_to_node = [column_index[f'order_to_node{i+1}'] for i in range(num_nodes)]
+        self.col_arrive_at_node = [column_index[f'arrive_at_node{i+1}'] for i in range(num_nodes)]
+        self.col_manufacturing_completed = column_index['manufacturing_completed']
+        self.col_customer_delivered = column_index['customer_delivered']
 
         # Initialize inventory units for initial inventory
+        if aggregate:
+            return
         for i, node in enumerate(self.nodes):
             for j in range(self.initial_inventories[i]):
                 unit_id = (f'init_{i+1}', j)
-                unit = TrackedUnit(unit_id)
+                # Add to metrics logger with None as customer_request_time for initial inventory
+                handle = self.metrics_logger.add_unit(unit_id, customer_request_time=None)
+                unit = TrackedUnit(unit_id, handle=handle, timelines=self.timelines)
                 node.inventory_units.append(unit)
                 self.tracked_units.append(unit)
-                # Add to metrics logger with None as customer_request_time for initial inventory
-                self.metrics_logger.add_unit(unit_id, customer_request_time=None)
 
     def step(self, customer_demand=None):
         t = self.time
-        # 0. Handle new customer demand: create TrackedUnit for each unit demanded
-        new_units = []
         if customer_demand is None:
-            customer_demand = random.randint(0, self.max_demand)
+            customer_demand = self.demand_rng.randint(0, self.max_demand)
         self.customer_demand_history.append(customer_demand)
+        if self.aggregate:
+            self._step_aggregate(t, customer_demand)
+        else:
+            self._step_units(t, customer_demand)
+
+        # 4. Collect stats
+        self.stats.append(self.collect_stats(t))
+        self.time += 1
+
+    def collect_stats(self, t):
+        return {
+            'time': t,
+            'inventories': [node.inventory_count() for node in self.nodes],
+            'customer_queues': [node.customer_queue_count() for node in self.nodes],
+            'incoming_shipments': [node.incoming_shipments_count() for node in self.nodes],
+            'incoming_orders': [node.incoming_orders_count() for node in self.nodes],
+        }
+
+    def _step_units(self, t, customer_demand):
+        # 0. Handle new customer demand: create TrackedUnit for each unit demanded
+        new_units = []
+        logger = self.metrics_logger
         for i in range(customer_demand):
             unit_id = (t, i)
-            unit = TrackedUnit(unit_id, t_demand_actual_customer=t)
+            # Add to metrics logger for each new demand unit
+            handle = logger.add_unit(unit_id, customer_request_time=t)
+            unit = TrackedUnit(unit_id, t_demand_actual_customer=t, handle=handle, timelines=self.timelines)
             new_units.append(unit)
             self.tracked_units.append(unit)
-            # Add to metrics logger for each new demand unit
-            self.metrics_logger.add_unit(unit_id, customer_request_time=t)
-            self.metrics_logger.update(unit.id, 'order_to_node1', t)
+            logger.set_value(handle, self.col_order_to_node[0], t)
         for unit in new_units:
             self.nodes[0].add_to_customer_queue(t, unit, t)
             # Node 1 propagates customer demand upstream to Node 2
             if self.num_nodes > 1:
                 arrival_time = t + self.nodes[0].order_comm_lag
                 self.nodes[1].incoming_orders.append((arrival_time, unit, t))
-                unit.timeline['t_order_to_supplier'] = t
-                unit.timeline['t_order_arrived_at_supplier'] = arrival_time
+                unit.timelines.set(unit.row, 't_order_to_supplier', t)
+                unit.timelines.set(unit.row, 't_order_arrived_at_supplier', arrival_time)
 
         # 1. All nodes receive shipments
         for node in self.nodes:
             received_units = node.receive_shipments(t)
+            col = self.col_arrive_at_node[node.node_id-1]
             for unit,requested_time in received_units:
-                self.metrics_logger.update(unit.id, f'arrive_at_node{node.node_id}', (t,requested_time))
+                logger.set_value(unit.handle, col, (t,requested_time))
 
         # 2. All nodes process incoming orders and propagate upstream
         for i in range(1, self.num_nodes):
@@ -197,7 +514,7 @@ class MultiNodeSimulation:
             for sent_time, unit in orders:
                 node.add_to_customer_queue(t, unit, sent_time)
                 # Update metrics for order placed to this node
-                self.metrics_logger.update(unit.id, f'order_to_node{node.node_id}', t)
+                logger.set_value(unit.handle, self.col_order_to_node[i], t)
                 if upstream_node is not None:
                     node.propagate_order_upstream(t, unit, upstream_node, node.order_comm_lag)
                 # For manufacturer, do not append again; already added via add_to_customer_queue
@@ -209,50 +526,136 @@ class MultiNodeSimulation:
                 # Process manufacturing and update metrics for completed units
                 completed_units = node.process_manufacturing(t, self.nodes[i-1])
                 for unit in completed_units:
-                    self.metrics_logger.update(unit.id, 'manufacturing_completed', t)
+                    logger.set_value(unit.handle, self.col_manufacturing_completed, t)
             else:
                 # Fulfill customer queue and get shipped units
                 shipped_units = node.fulfill_customer_queue(t, downstream_node=None if i == 0 else self.nodes[i-1])
                 for arrival_time, unit, shipped_time, requested_time in shipped_units:
                     if i == 0:
                         # Delivered to customer
-                        self.metrics_logger.update(unit.id, 'customer_delivered', (t,requested_time))
+                        logger.set_value(unit.handle, self.col_customer_delivered, (t,requested_time))
                     else:
                         # Shipped to next node (arrives will be logged on receipt)
                         pass
 
-        # 4. Collect stats
-        self.stats.append({
-            'time': t,
-            'inventories': [len(node.inventory_units) for node in self.nodes],
-            'customer_queues': [len(node.customer_queue) for node in self.nodes],
-            'incoming_shipments': [len(node.incoming_shipments) for node in self.nodes],
-            'incoming_orders': [len(node.incoming_orders) for node in self.nodes],
-        })
-        self.time += 1
+    def _step_aggregate(self, t, customer_demand):
+        # Same phases as _step_units, moving quantities instead of units
+        # 0. Customer demand joins node 1's queue and is ordered from node 2
+        self.nodes[0].add_to_customer_queue(t, customer_demand)
+        if self.num_nodes > 1 and customer_demand:
+            self.nodes[1].add_order(t + self.nodes[0].order_comm_lag, customer_demand)
+
+        # 1. All nodes receive shipments
+        for node in self.nodes:
+            node.receive_shipments(t)
+
+        # 2. All nodes process incoming orders and propagate upstream
+        for i in range(1, self.num_nodes):
+            node = self.nodes[i]
+            qty = node.receive_orders(t)
+            if qty:
+                node.add_to_customer_queue(t, qty)
+                if i < self.num_nodes - 1:
+                    node.propagate_order_upstream(t, qty, self.nodes[i+1], node.order_comm_lag)
+
+        # 3. All nodes fulfill customer queue
+        for i in range(self.num_nodes-1, -1, -1):
+            node = self.nodes[i]
+            if node.is_manufacturer:
+                node.process_manufacturing(t, self.nodes[i-1])
+            else:
+                node.fulfill_customer_queue(t, downstream_node=None if i == 0 else self.nodes[i-1])
 
     def is_finished(self):
         return self.time >= self.max_time
 
-    def reset(self):
+    def run_until_precise(self, target_half_width, metric='full_cycle', warmup='mser5', n_batches=20,
+                          confidence=0.95, check_every=100, min_time=0, min_batch_size=50):
+        """
+        Steps until the batch-means confidence interval for the steady-state
+        mean of `metric` (see MetricsLogger.steady_state_estimate) has a
+        half-width <= target_half_width, checking every `check_every` ticks
+        once min_time is reached, or until max_time. A stop is only allowed
+        once every batch spans at least min_batch_size ticks after the
+        warm-up: smaller batches are far from independent, and early series
+        miss the long cycles not completed yet. Returns the last estimate
+        with 'precise' set to whether the target was met.
+        """
+        if self.aggregate:
+            raise ValueError("run_until_precise needs per-unit metrics; it is not available in aggregate mode")
+        if check_every < 1:
+            raise ValueError("check_every must be >= 1")
+        if min_batch_size < 1:
+            raise ValueError("min_batch_size must be >= 1")
+
+        def precise(estimate):
+            return (estimate['half_width'] is not None
+                    and estimate['ticks'] // n_batches >= min_batch_size
+                    and estimate['half_width'] <= target_half_width)
+
+        estimate = None
+        while not self.is_finished():
+            self.step()
+            if self.time >= min_time and self.time % check_every == 0:
+                estimate = self.metrics_logger.steady_state_estimate(metric, warmup=warmup, n_batches=n_batches, confidence=confidence)
+                if precise(estimate):
+                    estimate['precise'] = True
+                    return estimate
+        estimate = self.metrics_logger.steady_state_estimate(metric, warmup=warmup, n_batches=n_batches, confidence=confidence)
+        estimate['precise'] = precise(estimate)
+        return estimate
+
+    def snapshot(self):
+        """
+        Returns a compact binary checkpoint of the full simulation state
+        (nodes, batches, units, metrics, random streams and time).
+        """
+        return checkpoint.dumps(self)
+
+    @classmethod
+    def restore(cls, data):
+        """Rebuilds a simulation from snapshot() output; it continues exactly as the original would."""
+        return checkpoint.loads(data, cls)
+
+    def fork(self):
+        """Returns an independent copy of the current state, e.g. to branch a what-if run."""
+        return self.restore(self.snapshot())
+
+    def reset(self, seed=None):
+        """
+        Restores the initial state for a new replication, reseeded with `seed`.
+        With seed=None the most recent seed is replayed: the one given to the
+        last reset(seed=...), else the constructor's. Node containers, the
+        metrics arrays and the timeline store are cleared in place and
+        reused. The initial inventory TrackedUnits, which always occupy the
+        first rows, are kept and put back into their nodes.
+        """
+        if seed is not None:
+            self.seed = seed
+            self.random_streams = RandomStreams(seed)
+        else:
+            # Same streams as the current run started with (also when seeded from fresh entropy)
+            self.random_streams = RandomStreams(self.random_streams.entropy)
+        self.demand_rng = self.random_streams.get('demand')
+        initial_units = sum(self.initial_inventories) if not self.aggregate else 0
+        del self.tracked_units[initial_units:]
+        self.timelines.reset(keep_rows=initial_units)
+        self.metrics_logger.reset(keep_rows=initial_units)
+        start = 0
         for i, node in enumerate(self.nodes):
-            node.inventory = self.initial_inventories[i]
-            node.customer_queue.clear()
-            node.order_queue.clear()
-            node.incoming_shipments.clear()
-            node.incoming_orders.clear()
-            if getattr(node, 'is_manufacturer', False):
-                node.production_queue.clear()
-                node.current_production_end = None
-                node.current_production_qty = 0
+            node.reset(self.initial_inventories[i])
+            if not self.aggregate:
+                node.inventory_units.extend(self.tracked_units[start:start + self.initial_inventories[i]])
+                start += self.initial_inventories[i]
         self.time = 0
-        self.stats = []
-        self.customer_demand_history = []
+        self.stats.clear()
+        self.customer_demand_history.clear()
 
-    def get_results(self):
-        # Returns a list of dicts with inventory values for each node at each timestep
+    def get_results(self, start=None, stop=None):
+        # Returns a list of dicts with inventory values for each node at each
+        # timestep, optionally only for the slice [start:stop] of the timesteps
         results = []
-        for stat in self.stats:
+        for stat in self.stats[start:stop]:
             row = {}
             for i, inv in enumerate(stat['inventories']):
                 row[f"Node {i+1} Inv"] = inv
@@ -261,3 +664,104 @@ class MultiNodeSimulation:
 
     def get_tracked_units(self):
         return self.tracked_units
+
+
+class EventDrivenSimulation(MultiNodeSimulation):
+    """
+    Next-event time advance over the quantity-aggregated model. Every cohort
+    created (order or shipment arrival, batch completion) and every scheduled
+    demand pushes its due time onto one heap, and advance() jumps straight to
+    the next due tick instead of stepping through idle ticks. Between events
+    the state cannot change: after a tick each node has either no queue or no
+    inventory left to ship.
+
+    demand_schedule maps time -> quantity (missing times have zero demand).
+    Without it demand is drawn at random every tick, as in
+    MultiNodeSimulation, and every tick is an event.
+
+    self.stats and self.customer_demand_history only hold the processed ticks;
+    per_tick_stats() and get_results() expand them to one row per tick,
+    identical to MultiNodeSimulation for the same demand.
+    """
+    def __init__(self, *args, demand_schedule=None, **kwargs):
+        kwargs['aggregate'] = True
+        super().__init__(*args, **kwargs)
+        self.calendar = []
+        for node in self.nodes:
+            node.calendar = self.calendar
+        self.demand_schedule = dict(demand_schedule) if demand_schedule is not None else None
+        if self.demand_schedule is not None:
+            for time, qty in self.demand_schedule.items():
+                if qty:
+                    heapq.heappush(self.calendar, time)
+        self.initial_stats = self.collect_stats(0)
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        self.calendar.clear()
+        if self.demand_schedule is not None:
+            for time, qty in self.demand_schedule.items():
+                if qty:
+                    heapq.heappush(self.calendar, time)
+
+    def next_event_time(self):
+        """
+        Returns the next tick that must be processed, or None if nothing is
+        pending. Cohorts due at or before an already processed tick (e.g. a
+        zero-lag shipment sent after the receive phase) are due now.
+        """
+        if self.demand_schedule is None:
+            return self.time
+        if not self.calendar:
+            return None
+        return max(self.calendar[0], self.time)
+
+    def advance(self):
+        """
+        Processes the next event tick. Returns False once no event is left
+        before max_time, leaving the clock at max_time.
+        """
+        t = self.next_event_time()
+        if t is None or t >= self.max_time:
+            self.time = max(self.time, self.max_time)
+            return False
+        # Everything due by t is handled by the phases of tick t
+        while self.calendar and self.calendar[0] <= t:
+            heapq.heappop(self.calendar)
+        self.time = t
+        demand = None if self.demand_schedule is None else self.demand_schedule.get(t, 0)
+        self.step(demand)
+        return True
+
+    def run(self):
+        while self.advance():
+            pass
+
+    def per_tick_stats(self):
+        """Expands the event-tick stats to one entry per simulated tick."""
+        expanded = []
+        last = self.initial_stats
+        events = iter(self.stats)
+        next_stat = next(events, None)
+        for t in range(self.time):
+            if next_stat is not None and next_stat['time'] == t:
+                last = next_stat
+                next_stat = next(events, None)
+                expanded.append(last)
+            else:
+                expanded.append(dict(last, time=t))
+        return expanded
+
+    def per_tick_demand_history(self):
+        if self.demand_schedule is None:
+            return list(self.customer_demand_history)
+        return [self.demand_schedule.get(t, 0) for t in range(self.time)]
+
+    def get_results(self, start=None, stop=None):
+        results = []
+        for stat in self.per_tick_stats()[start:stop]:
+            row = {}
+            for i, inv in enumerate(stat['inventories']):
+                row[f"Node {i+1} Inv"] = inv
+            results.append(row)
+        return results
@@ -0,0 +1,97 @@
+# Steady-state output analysis for simulation time series
+# MSER-5 warm-up detection and batch-means confidence intervals (numpy only)
+
+import math
+import statistics
+
+import numpy as np
+
+def mser5(series):
+    """
+    Returns the warm-up length (number of leading observations to drop) that
+    minimizes the MSER statistic on batch means of 5 observations. Only
+    truncation points in the first half of the series are considered.
+    """
+    series = np.asarray(series, dtype=float)
+    b = len(series) // 5
+    if b < 2:
+        return 0
+    z = series[:b * 5].reshape(b, 5).mean(axis=1)
+    # MSER(d) = sum_{j>=d} (z_j - mean(z[d:]))^2 / (b - d)^2, from suffix sums
+    suffix_sum = np.cumsum(z[::-1])[::-1]
+    suffix_sq = np.cumsum((z * z)[::-1])[::-1]
+    d = np.arange(b // 2 + 1)
+    count = b - d
+    sse = suffix_sq[d] - suffix_sum[d] ** 2 / count
+    return int(np.argmin(sse / count ** 2)) * 5
+
+# Below this many degrees of freedom t_quantile inverts the exact CDF
+EXACT_T_DF = 30
+
+def t_cdf_abs(t, df):
+    """
+    P(|T| < t) for Student t with integer df >= 1, from the finite series
+    of Abramowitz & Stegun 26.7.3/26.7.4.
+    """
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    if df % 2:
+        total = 0.0
+        if df > 1:
+            term = math.cos(theta)
+            total = term
+            for k in range(3, df - 1, 2):
+                term *= c2 * (k - 1) / k
+                total += term
+        return 2 / math.pi * (theta + math.sin(theta) * total)
+    term = 1.0
+    total = 1.0
+    for k in range(2, df - 1, 2):
+        term *= c2 * (k - 1) / k
+        total += term
+    return math.sin(theta) * total
+
+def t_quantile(p, df):
+    """
+    Student t quantile. For integer df < EXACT_T_DF the exact CDF is
+    inverted by bisection; otherwise the normal quantile is corrected with
+    the Cornish-Fisher expansion (accurate to about 1e-4 there).
+    """
+    if df < 1:
+        raise ValueError("df must be >= 1")
+    if df >= EXACT_T_DF or df != int(df):
+        z = statistics.NormalDist().inv_cdf(p)
+        return (z + (z**3 + z) / (4 * df)
+                + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+                + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3))
+    if p == 0.5:
+        return 0.0
+    target = abs(2 * p - 1)  # P(|T| < t) for the quantile's magnitude
+    low, high = 0.0, 1.0
+    while t_cdf_abs(high, int(df)) < target:
+        high *= 2
+    for _ in range(100):
+        mid = (low + high) / 2
+        if t_cdf_abs(mid, int(df)) < target:
+            low = mid
+        else:
+            high = mid
+    return math.copysign((low + high) / 2, p - 0.5)
+
+def batch_means_ci(series, n_batches=20, confidence=0.95):
+    """
+    Returns (mean, half_width) of a confidence interval for the steady-state
+    mean from `n_batches` non-overlapping batch means. half_width is None if
+    there are fewer observations than batches.
+    """
+    if n_batches < 2:
+        raise ValueError("n_batches must be >= 2")
+    series = np.asarray(series, dtype=float)
+    if len(series) == 0:
+        return None, None
+    size = len(series) // n_batches
+    if size == 0:
+        return float(series.mean()), None
+    means = series[-size * n_batches:].reshape(n_batches, size).mean(axis=1)
+    half_width = t_quantile(0.5 + confidence / 2, n_batches - 1) * means.std(ddof=1) / np.sqrt(n_batches)
+    return float(means.mean()), float(half_width)
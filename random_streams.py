@@ -0,0 +1,49 @@
+# Per-simulation random number streams
+# Each simulation owns a RandomStreams instead of seeding the global `random`
+# module, so several simulations can run in one process or thread pool.
+
+import hashlib
+import random
+import zlib
+
+import numpy as np
+
+def seed_entropy(seed):
+    """
+    Maps a seed to what SeedSequence accepts: None and non-negative ints are
+    kept, any other seed random.seed() took (negative ints, floats, str,
+    bytes) becomes a non-negative int from a sha256 of its repr.
+    """
+    if seed is None or (isinstance(seed, int) and not isinstance(seed, bool) and seed >= 0):
+        return seed
+    return int.from_bytes(hashlib.sha256(repr(seed).encode()).digest(), 'big')
+
+class RandomStreams:
+    def __init__(self, seed=None):
+        """
+        Independent named random.Random streams derived from one seed with
+        numpy's SeedSequence. A stream depends only on the seed and its name,
+        not on which other streams exist or the order they are used in.
+        With seed=None fresh entropy is drawn; it is kept in self.entropy so
+        the run can be reproduced with RandomStreams(self.entropy).
+        """
+        self.seed = seed
+        self.entropy = np.random.SeedSequence(seed_entropy(seed)).entropy
+        self.streams = {}
+
+    def _child_seed(self, kind, name):
+        # kind keeps streams and spawned children of the same name apart
+        child = np.random.SeedSequence(self.entropy, spawn_key=(kind, zlib.crc32(name.encode())))
+        return int.from_bytes(child.generate_state(4).tobytes(), 'little')
+
+    def get(self, name):
+        """Returns the stream for `name`, creating it on first use."""
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = random.Random(self._child_seed(0, name))
+            self.streams[name] = stream
+        return stream
+
+    def spawn(self, name):
+        """Returns a child RandomStreams, e.g. for one replication of a batch."""
+        return RandomStreams(self._child_seed(1, name))
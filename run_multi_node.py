@@ -0,0 +1,139 @@
+# Headless runner for MultiNodeSimulation
+# Reads config.json (plus command-line overrides), runs to max_time and writes
+# the stats, inventory results, per-unit metrics and cycle-time history.
+# Does not import Streamlit or matplotlib.
+#
+# Example:
+#   python run_multi_node.py --max-time 2000 --seed 1 --format parquet --out-dir runs/seed1
+
+import argparse
+import csv
+import json
+import os
+
+from multi_node_simulation import MultiNodeSimulation
+
+def load_config(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+def int_list(value):
+    return [int(x) for x in value.split(',')]
+
+def flatten_stats(stats):
+    """One flat row per tick: per-node lists become <key>_node<i> columns."""
+    rows = []
+    for stat in stats:
+        row = {'time': stat['time']}
+        for key, values in stat.items():
+            if key == 'time':
+                continue
+            for i, value in enumerate(values):
+                row[f"{key}_node{i+1}"] = value
+        rows.append(row)
+    return rows
+
+def write_table(rows_or_columns, path, fmt):
+    """
+    Writes a table given as a list of row dicts or a dict of columns.
+    JSON and CSV need only the standard library; Parquet needs pandas and
+    pyarrow.
+    """
+    if isinstance(rows_or_columns, dict):
+        keys = list(rows_or_columns)
+        rows = [dict(zip(keys, values)) for values in zip(*rows_or_columns.values())]
+    else:
+        rows = rows_or_columns
+    if fmt == 'json':
+        with open(path, "w") as f:
+            json.dump(rows, f)
+    elif fmt == 'csv':
+        fieldnames = list(rows[0]) if rows else []
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(path, index=False)
+
+def build_simulation(config):
+    num_nodes = config.get("num_nodes", 4)
+    return MultiNodeSimulation(
+        num_nodes,
+        config.get("initial_inventories", [50]*num_nodes),
+        config.get("order_comm_lags", [1]*num_nodes),
+        config.get("lag_times", [3]*num_nodes),
+        max_time=config.get("max_time", 30),
+        manufacturing_time=config.get("manufacturing_time", 3),
+        max_demand=config.get("max_demand", 50),
+        seed=config.get("seed", None),
+        aggregate=config.get("aggregate", False),
+    )
+
+def run(config, out_dir, fmt='json', cycle_history=True):
+    """
+    Runs the configured simulation to max_time and writes stats, results,
+    metrics and cycle_time_history files to out_dir. Returns the simulation.
+    """
+    sim = build_simulation(config)
+    track_cycles = cycle_history and not sim.aggregate
+    while not sim.is_finished():
+        sim.step()
+        if track_cycles:
+            sim.metrics_logger.snapshot_cycle_times(save_history=True)
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_table(flatten_stats(sim.stats), os.path.join(out_dir, f"stats.{fmt}"), fmt)
+    results = sim.get_results()
+    for row, demand in zip(results, sim.customer_demand_history):
+        row['Demand'] = demand
+    write_table(results, os.path.join(out_dir, f"results.{fmt}"), fmt)
+    if not sim.aggregate:
+        metrics_path = os.path.join(out_dir, f"metrics.{fmt}")
+        if fmt == 'parquet':
+            # Keeps the nullable integer columns instead of float64 with NaN
+            sim.metrics_logger.to_dataframe().to_parquet(metrics_path, index=False)
+        else:
+            write_table(sim.metrics_logger.to_columns(), metrics_path, fmt)
+    if track_cycles:
+        write_table(sim.metrics_logger.cycle_time_history, os.path.join(out_dir, f"cycle_time_history.{fmt}"), fmt)
+    return sim
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MultiNodeSimulation without the Streamlit app")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json"),
+                        help="Configuration file (default: config.json next to this script)")
+    parser.add_argument("--num-nodes", type=int)
+    parser.add_argument("--max-time", type=int)
+    parser.add_argument("--max-demand", type=int)
+    parser.add_argument("--initial-inventories", type=int_list, help="Comma-separated, one per node")
+    parser.add_argument("--order-comm-lags", type=int_list, help="Comma-separated, one per node")
+    parser.add_argument("--lag-times", type=int_list, help="Comma-separated, one per node")
+    parser.add_argument("--manufacturing-time", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--aggregate", action="store_true", default=None,
+                        help="Quantity-aggregated mode (no per-unit metrics)")
+    parser.add_argument("--format", choices=['json', 'csv', 'parquet'], default='json')
+    parser.add_argument("--no-cycle-history", action="store_true", help="Skip the per-step cycle-time history")
+    parser.add_argument("--out-dir", default="output")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    for key in ['num_nodes', 'max_time', 'max_demand', 'initial_inventories', 'order_comm_lags',
+                'lag_times', 'manufacturing_time', 'seed', 'aggregate']:
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet needs pandas and pyarrow installed")
+    sim = run(config, args.out_dir, fmt=args.format, cycle_history=not args.no_cycle_history)
+    print(f"Ran {sim.time} steps, wrote {args.format} files to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Background runner for the Streamlit dashboards
+# Steps a simulation to max_time on a worker thread so the script run that
+# started it returns at once. The page polls the runner for progress and the
+# snapshots it publishes, and can pause, resume or cancel the run.
+
+import threading
+
+# Steps taken per lock acquisition; readers wait at most this many steps
+STEPS_PER_CHUNK = 25
+
+class SimulationRunner:
+    def __init__(self, sim, step=None, snapshot=None, max_snapshots=200, lock=None):
+        """
+        Runs `step()` (default sim.step) until sim.is_finished(). Every
+        (max_time / max_snapshots) steps, and once at the end, snapshot(sim)
+        is called and its result appended to self.snapshots, so a run
+        publishes at most about max_snapshots of them.
+
+        The worker holds self.lock (`lock` if given) while stepping; hold it
+        too when reading the simulation from another thread.
+        """
+        self.sim = sim
+        self.step = step if step is not None else sim.step
+        self.snapshot = snapshot
+        self.snapshot_every = max(1, (sim.max_time - sim.time) // max_snapshots)
+        self.lock = lock if lock is not None else threading.RLock()
+        self.snapshots = []
+        self.error = None
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def cancel(self, timeout=None):
+        """Stops the run after the current chunk and waits for the worker."""
+        self._cancel.set()
+        self._resume.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    @property
+    def state(self):
+        """One of 'running', 'paused', 'cancelled', 'failed' or 'finished'."""
+        if self._thread.is_alive():
+            return 'running' if self._resume.is_set() else 'paused'
+        if self.error is not None:
+            return 'failed'
+        return 'cancelled' if self._cancel.is_set() else 'finished'
+
+    def is_active(self):
+        return self._thread.is_alive()
+
+    def progress(self):
+        """Fraction of max_time simulated so far."""
+        return min(1.0, self.sim.time / self.sim.max_time) if self.sim.max_time else 1.0
+
+    def _publish(self):
+        if self.snapshot is not None:
+            self.snapshots.append(self.snapshot(self.sim))
+
+    def _run(self):
+        try:
+            while not self._cancel.is_set():
+                self._resume.wait()
+                if self._cancel.is_set():
+                    break
+                with self.lock:
+                    for _ in range(STEPS_PER_CHUNK):
+                        if self.sim.is_finished():
+                            break
+                        self.step()
+                        if self.sim.time % self.snapshot_every == 0:
+                            self._publish()
+                    if self.sim.is_finished():
+                        if self.sim.time % self.snapshot_every:
+                            self._publish()
+                        break
+        except Exception as error:
+            # Surfaced to the page through state/error; the thread just ends
+            self.error = error
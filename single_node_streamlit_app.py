@@ -2,8 +2,23 @@
 # Run with: streamlit run streamlit_app.py
 
 import streamlit as st
+from charting import DownsampledSeries, StreamingHistogram, histogram_spec, line_chart_spec, series_frame
 from main import Simulation
 
+def new_charts():
+    # Chart data updated once per step, so drawing does not rescan sim.stats
+    return {
+        'queue_sizes': {'Product Queue Size': DownsampledSeries(), 'Customer Queue Size': DownsampledSeries()},
+        'product_queue_in_front_of_last': StreamingHistogram(),
+        'customer_queue_in_front_of_last': StreamingHistogram(),
+    }
+
+def update_charts(charts, state):
+    charts['queue_sizes']['Product Queue Size'].append(state['time'], state['product_queue_size'])
+    charts['queue_sizes']['Customer Queue Size'].append(state['time'], state['customer_queue_size'])
+    charts['product_queue_in_front_of_last'].add(state['product_queue_in_front_of_last'])
+    charts['customer_queue_in_front_of_last'].add(state['customer_queue_in_front_of_last'])
+
 # --- Streamlit App State Management ---
 if 'sim' not in st.session_state:
     st.session_state.sim = Simulation(
@@ -17,8 +32,10 @@ if 'sim' not in st.session_state:
     )
     st.session_state.sim.reset()
     st.session_state.last_state = None
+    st.session_state.charts = new_charts()
 
 sim = st.session_state.sim
+charts = st.session_state.charts
 
 st.title('Supply Chain Simulation (Step-by-Step)')
 
@@ -28,10 +45,12 @@ with col1:
     if st.button('Next Step'):
         if not sim.is_finished():
             st.session_state.last_state = sim.step()
+            update_charts(charts, st.session_state.last_state)
 with col2:
     if st.button('Reset Simulation'):
         sim.reset()
         st.session_state.last_state = None
+        charts = st.session_state.charts = new_charts()
 
 # Show current state
 time = sim.time if not sim.is_finished() else sim.time - 1
@@ -79,16 +98,10 @@ st.write(f"Quantity in front of last: {state['product_queue_in_front_of_last']}"
 
 st.subheader('Orders with Manufacturer (in transit)')
 if state['orders_with_manufacturer']:
-    # Support both old (tuple) and new (dict) formats for backward compatibility
-    orders = state['orders_with_manufacturer']
-    if isinstance(orders[0], dict):
-        st.table([
-            {'Order Time': o['order_time'], 'Arrival Time': o['arrival_time'], 'Quantity': o['quantity']} for o in orders
-        ])
-    else:
-        st.table([
-            {'Arrival Time': at, 'Quantity': q} for (at, q) in orders
-        ])
+    st.table([
+        {'Order Time': o['order_time'], 'Arrival Time': o['arrival_time'], 'Quantity': o['quantity']}
+        for o in state['orders_with_manufacturer']
+    ])
 else:
     st.write('No orders in transit.')
 
@@ -112,6 +125,15 @@ if state['customer_arrived']:
 else:
     st.info("No customer arrived this step.")
 
+# Summary counters from the stats sink (kept even when states are not retained)
+st.subheader('Run Summary')
+if sim.stats.steps:
+    st.write(sim.stats.summary())
+    if len(sim.stats) < sim.stats.steps:
+        st.caption(f"The stats sink retains {len(sim.stats)} of {sim.stats.steps} steps; the demand table below shows only those, the charts cover every step.")
+else:
+    st.write('No steps yet.')
+
 # Table of demand from consumer at each timestep
 st.subheader('Demand from Consumer at Each Timestep')
 if hasattr(sim, 'stats') and sim.stats:
@@ -124,42 +146,24 @@ else:
     st.write('No demand data yet.')
 
 # Histograms of 'in front of last' values
-import matplotlib.pyplot as plt
-import numpy as np
-
 st.subheader("Histogram: Product Queue In Front of Last")
-if hasattr(sim, 'product_queue_in_front_of_last_hist') and sim.product_queue_in_front_of_last_hist:
-    fig1, ax1 = plt.subplots()
-    ax1.hist(sim.product_queue_in_front_of_last_hist, bins=20, color='skyblue', edgecolor='black')
-    ax1.set_xlabel('Quantity in Front of Last (Product Queue)')
-    ax1.set_ylabel('Frequency')
-    st.pyplot(fig1)
+if charts['product_queue_in_front_of_last'].total:
+    st.vega_lite_chart(charts['product_queue_in_front_of_last'].to_frame().reset_index(),
+                       histogram_spec('Quantity in Front of Last (Product Queue)'), width='stretch')
 else:
     st.write("No data yet.")
 
 st.subheader("Histogram: Customer Queue In Front of Last")
-if hasattr(sim, 'customer_queue_in_front_of_last_hist') and sim.customer_queue_in_front_of_last_hist:
-    fig2, ax2 = plt.subplots()
-    ax2.hist(sim.customer_queue_in_front_of_last_hist, bins=20, color='salmon', edgecolor='black')
-    ax2.set_xlabel('Quantity in Front of Last (Customer Queue)')
-    ax2.set_ylabel('Frequency')
-    st.pyplot(fig2)
+if charts['customer_queue_in_front_of_last'].total:
+    st.vega_lite_chart(charts['customer_queue_in_front_of_last'].to_frame().reset_index(),
+                       histogram_spec('Quantity in Front of Last (Customer Queue)'), width='stretch')
 else:
     st.write("No data yet.")
 
 # --- Queue Size Over Time ---
 st.subheader("Queue Size Over Time")
-if hasattr(sim, 'stats') and sim.stats:
-    times = [s['time'] for s in sim.stats]
-    product_queue_sizes = [s['product_queue_size'] for s in sim.stats]
-    customer_queue_sizes = [s['customer_queue_size'] for s in sim.stats]
-    fig_q, ax_q = plt.subplots()
-    ax_q.plot(times, product_queue_sizes, label='Product Queue Size', color='blue')
-    ax_q.plot(times, customer_queue_sizes, label='Customer Queue Size', color='red')
-    ax_q.set_xlabel('Time')
-    ax_q.set_ylabel('Queue Size')
-    ax_q.legend()
-    st.pyplot(fig_q)
+if len(charts['queue_sizes']['Product Queue Size']):
+    st.vega_lite_chart(series_frame(charts['queue_sizes']), line_chart_spec(y_title='Queue Size'), width='stretch')
 else:
     st.write('No queue size data yet.')
 
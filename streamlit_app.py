@@ -1,95 +1,48 @@
 # Multi-Node Supply Chain Streamlit App
 # Author: GitHub Copilot
 # Visualizes the multi-node supply chain simulation with node inventories and queue details
+#
+# Every widget interaction reruns this script. The simulation lives in the
+# session and is only rebuilt when the sidebar parameters change; the derived
+# views (tables, diagram) are memoized with st.cache_data on the session's run
+# token and sim.time, so a rerun only recomputes what a step actually changed.
+# "Run Full Simulation" steps the simulation on a SimulationRunner thread while
+# a polling fragment shows its progress. Charts are drawn from charting's
+# per-step downsampled series, so their size does not grow with the run.
+
+import io
+import json
+import os
+import threading
+import uuid
 
 import streamlit as st
 import matplotlib.pyplot as plt
-from multi_node_simulation import MultiNodeSimulation
 import pandas as pd
-import json
-import os
+from charting import DownsampledSeries, RunningStats, StreamingHistogram, histogram_spec, line_chart_spec, series_frame
+from multi_node_simulation import MultiNodeSimulation
+from simulation_runner import SimulationRunner
+
+# Number of (run token, time) entries kept per cached view
+VIEW_CACHE_ENTRIES = 32
+# Page sizes offered for the row tables; only the visible page is sent to the browser
+PAGE_SIZES = [25, 50, 100, 250]
+# Due times listed under each node in the supply chain diagram
+DIAGRAM_DUE_TIMES = 5
+# Seconds between progress polls while a background run is active
+POLL_INTERVAL = 0.5
 
 st.set_page_config(layout="wide")
 st.title("Multi-Node Supply Chain Simulation")
 
-# Load config file for defaults
-config_path = os.path.join(os.path.dirname(__file__), "config.json")
-if os.path.exists(config_path):
-    with open(config_path, "r") as f:
-        config = json.load(f)
-else:
-    config = {}
-
-
-
-# ...existing code...
-
-
-
-# Ensure simulation is initialized in session state
-if 'sim' not in st.session_state:
-    st.session_state.sim = MultiNodeSimulation(
-        config.get("num_nodes", 4),
-        config.get("initial_inventories", [50]*config.get("num_nodes", 4)),
-        config.get("order_comm_lags", [1]*config.get("num_nodes", 4)),
-        config.get("lag_times", [3]*config.get("num_nodes", 4)),
-        max_time=config.get("max_time", 30),
-        manufacturing_time=config.get("manufacturing_time", 3),
-        max_demand=config.get("max_demand", 50),
-        seed=config.get("seed", None)
-    )
-    st.session_state.sim.reset()
-
-sim = st.session_state.sim
+def load_config(path):
+    # Load config file for defaults; read on every run so edits apply at once
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
 
-
-# Controls
-
-col1, col2, col3 = st.columns(3)
-with col1:
-    customer_demand = st.number_input(
-        "Customer Demand (this step, leave blank for random)",
-        min_value=0, max_value=1000, value=None, step=1,
-        key="customer_demand_input_main"
-    )
-    if st.button("Next Step", key="next_step_btn_main"):
-        # If no value entered, use None for random demand
-        if customer_demand is not None:
-            st.session_state.last_customer_demand = customer_demand
-        else:
-            st.session_state.last_customer_demand = None
-        if not sim.is_finished():
-            sim.step(st.session_state.last_customer_demand)
-with col2:
-    if st.button("Reset Simulation", key="reset_sim_btn_main"):
-        sim.reset()
-        # Reset cycle time history for a clean run
-        if hasattr(sim, 'metrics_logger'):
-            sim.metrics_logger.cycle_time_history = []
-        st.session_state.last_customer_demand = None
-with col3:
-    if st.button("Run Full Simulation", key="run_full_sim_btn_main"):
-        # Reset cycle time history before running full simulation
-        if hasattr(sim, 'metrics_logger'):
-            sim.metrics_logger.cycle_time_history = []
-        while not sim.is_finished():
-            sim.step()
-            # Save cycle times at each step
-            if hasattr(sim, 'metrics_logger'):
-                sim.metrics_logger.compute_cycle_times(save_history=True)
-
-# Show average demand immediately after controls
-if sim.customer_demand_history:
-    avg_demand = sum(sim.customer_demand_history) / len(sim.customer_demand_history)
-    st.subheader(f"Average Demand: {avg_demand:.2f}")
-    print(f"Average Demand: {avg_demand:.2f}")
-    print(f"Customer Demand History: {sim.customer_demand_history}")
-
-    
-# Options to show/hide each section
-show_node_stats = config.get("show_node_stats", True)
-show_simulation_results = config.get("show_simulation_results", True)
-show_supply_chain_figure = config.get("show_supply_chain_figure", True)
+config = load_config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json"))
 
 # Sidebar for parameters, using config defaults if available
 st.sidebar.header("Simulation Parameters")
@@ -103,175 +56,348 @@ lag_times = st.sidebar.text_input("Lag Times (comma-separated)", value=','.join(
 manufacturing_time = st.sidebar.number_input("Manufacturing Time (last node)", min_value=1, max_value=20, value=config.get("manufacturing_time", 3), key="manufacturing_time_input")
 seed = st.sidebar.text_input("Random Seed (leave blank for random)", value=str(config.get("seed", "")), key="seed_input")
 
-init_inv = [int(x) for x in init_inv.split(',')]
-order_comm_lags = [int(x) for x in order_comm_lags.split(',')]
-lag_times = [int(x) for x in lag_times.split(',')]
+# Options to show/hide each section
+show_node_stats = st.sidebar.checkbox("Show Node Stats", value=config.get("show_node_stats", True), key="show_node_stats_input")
+show_simulation_results = st.sidebar.checkbox("Show Simulation Results", value=config.get("show_simulation_results", True), key="show_simulation_results_input")
+show_supply_chain_figure = st.sidebar.checkbox("Show Supply Chain Figure", value=config.get("show_supply_chain_figure", True), key="show_supply_chain_figure_input")
+
+try:
+    init_inv = [int(x) for x in init_inv.split(',')]
+    order_comm_lags = [int(x) for x in order_comm_lags.split(',')]
+    lag_times = [int(x) for x in lag_times.split(',')]
+except ValueError:
+    st.sidebar.error("Inventories and lags must be comma-separated integers.")
+    st.stop()
 # Fix seed parsing to handle None and non-integer values gracefully
 try:
     seed_val = int(seed) if seed.strip() and seed.strip().lower() != 'none' else None
 except ValueError:
     seed_val = None
 
-# Session state for simulation
-if (
-    'sim' not in st.session_state or
-    st.session_state.sim.num_nodes != num_nodes or
-    st.session_state.sim.initial_inventories != init_inv or
-    [n.order_comm_lag for n in st.session_state.sim.nodes] != order_comm_lags or
-    [n.lag_time for n in st.session_state.sim.nodes] != lag_times or
-    st.session_state.sim.max_time != max_time or
-    st.session_state.sim.manufacturing_time != manufacturing_time or
-    st.session_state.sim.max_demand != max_demand or
-    st.session_state.sim.seed != seed_val
-):
-    st.session_state.sim = MultiNodeSimulation(num_nodes, init_inv, order_comm_lags, lag_times, max_time=max_time, manufacturing_time=manufacturing_time, max_demand=max_demand, seed=seed_val)
-    st.session_state.sim.reset()
+params = (num_nodes, tuple(init_inv), tuple(order_comm_lags), tuple(lag_times),
+          max_time, manufacturing_time, max_demand, seed_val)
+
+def new_charts(sim):
+    # Downsampled series, histogram bins and running totals, updated once per
+    # step by step(), so no view has to rescan the whole run
+    nodes = [f"Node {i+1}" for i in range(sim.num_nodes)]
+    return {
+        'inventory': {name: DownsampledSeries() for name in nodes},
+        'customer_queue': {name: DownsampledSeries() for name in nodes},
+        'cycle_times': {name: DownsampledSeries() for name in sim.metrics_logger.cycle_metric_names()},
+        'demand': StreamingHistogram(),
+        'inventory_stats': {name: RunningStats() for name in nodes},
+        'demand_stats': RunningStats(),
+    }
+
+def start_run():
+    # A fresh token per run keys the cached views, so runs of other sessions
+    # (or an earlier run of this one) with the same parameters never collide
+    st.session_state.run_token = uuid.uuid4().hex
     st.session_state.last_customer_demand = None
+    st.session_state.charts = new_charts(st.session_state.sim)
+
+def step(sim, charts, customer_demand=None):
+    # Also runs on the runner thread, so it must not touch st.session_state
+    sim.step(customer_demand)
+    # One cycle time history row per step
+    averages = sim.metrics_logger.snapshot_cycle_times(save_history=True)
+    stat = sim.stats[-1]
+    for i, name in enumerate(charts['inventory']):
+        charts['inventory'][name].append(stat['time'], stat['inventories'][i])
+        charts['customer_queue'][name].append(stat['time'], stat['customer_queues'][i])
+        charts['inventory_stats'][name].add(stat['inventories'][i])
+    for name, series in charts['cycle_times'].items():
+        series.append(stat['time'], averages[name])
+    charts['demand'].add(sim.customer_demand_history[-1])
+    charts['demand_stats'].add(sim.customer_demand_history[-1])
+
+def stop_runner():
+    runner = st.session_state.get('runner')
+    if runner is not None:
+        runner.cancel()
+        st.session_state.runner = None
+
+def reset_simulation():
+    stop_runner()
+    st.session_state.sim.reset()
+    start_run()
+
+def start_background_run():
+    sim = st.session_state.sim
+    charts = st.session_state.charts
+    st.session_state.runner = SimulationRunner(sim, step=lambda: step(sim, charts), lock=st.session_state.sim_lock).start()
+
+# Session state for simulation: rebuilt only when the parameters change
+if st.session_state.get('sim_params') != params:
+    stop_runner()
+    st.session_state.sim = MultiNodeSimulation(num_nodes, init_inv, order_comm_lags, lag_times, max_time=max_time, manufacturing_time=manufacturing_time, max_demand=max_demand, seed=seed_val)
+    st.session_state.sim_params = params
+    # Held by the runner thread while it steps, and by this script while it reads the simulation
+    st.session_state.sim_lock = threading.RLock()
+    start_run()
 
 sim = st.session_state.sim
+sim_lock = st.session_state.sim_lock
+runner = st.session_state.get('runner')
+running = runner is not None and runner.state == 'running'
 
 # Controls
 
 col1, col2, col3 = st.columns(3)
 with col1:
-    customer_demand = st.number_input("Customer Demand (this step, leave blank for random)", min_value=0, max_value=1000, value=None, step=1)
-    if st.button("Next Step"):
+    customer_demand = st.number_input(
+        "Customer Demand (this step, leave blank for random)",
+        min_value=0, max_value=1000, value=None, step=1,
+        key="customer_demand_input_main"
+    )
+    if st.button("Next Step", key="next_step_btn_main", disabled=running):
         # If no value entered, use None for random demand
-        if customer_demand is not None:
-            st.session_state.last_customer_demand = customer_demand
-        else:
-            st.session_state.last_customer_demand = None
-        if not sim.is_finished():
-            sim.step(st.session_state.last_customer_demand)
+        st.session_state.last_customer_demand = customer_demand
+        with sim_lock:
+            if not sim.is_finished():
+                step(sim, st.session_state.charts, customer_demand)
 with col2:
-    if st.button("Reset Simulation"):
-        sim.reset()
-        # Reset cycle time history for a clean run
-        if hasattr(sim, 'metrics_logger'):
-            sim.metrics_logger.cycle_time_history = []
-        st.session_state.last_customer_demand = None
+    # Callbacks run before the script, so `running` and the controls already reflect the new run state
+    st.button("Reset Simulation", key="reset_sim_btn_main", on_click=reset_simulation)
 with col3:
-    if st.button("Run Full Simulation"):
-        # Reset cycle time history before running full simulation
-        if hasattr(sim, 'metrics_logger'):
-            sim.metrics_logger.cycle_time_history = []
-        while not sim.is_finished():
-            sim.step()
-            # Save cycle times at each step
-            if hasattr(sim, 'metrics_logger'):
-                sim.metrics_logger.compute_cycle_times(save_history=True)
-
-st.header(f"Time Step: {sim.time}")
-
-# Show stats table
-st.subheader("Node Stats Table")
-def get_manufacturer_batches(node):
-    batches = getattr(node, 'active_batches', [])
-    batch_list = []
-    for batch in batches:
-        batch_list.append(
-            f"(start:{batch['start']}, end:{batch['end']}, qty:{len(batch['units'])}, units:{[u.id for u in batch['units']]})"
-        )
-    return batch_list
-
-st.table({
-    f"Node {i+1}": {
-        "Inventory": len(sim.nodes[i].inventory_units),
-        "Customer Queue": [(arrival_time, qty, requested_time) for (arrival_time, qty, unit, requested_time) in list(sim.nodes[i].customer_queue)],
-        "Supplier Queue": [(order_time, qty) for (order_time, qty, unit) in list(sim.nodes[i].order_queue)],
-        "Shipments in Transit": [
-            f"(arrives:{arr}, unit:{getattr(unit, 'id', unit)}, sent:{sent}" + (f", requested:{req})" if len(shipment) == 4 else ")")
-            for shipment in sim.nodes[i].incoming_shipments
-            for (arr, unit, sent, *rest) in [shipment]
-            for req in (rest[0] if rest else None,)
-        ],
-        **({
-            "Active Batches": get_manufacturer_batches(sim.nodes[i])
-        } if getattr(sim.nodes[i], 'is_manufacturer', False) else {})
-    } for i in range(num_nodes)
-})
-
-# Add demand display to the main table
-st.subheader("Simulation Results")
-results = st.session_state.sim.get_results()
-demand_row = [d for d in st.session_state.sim.customer_demand_history]
-
-# Build table headers
-headers = [f"Node {i+1} Inv" for i in range(st.session_state.sim.num_nodes)] + ["Demand"]
-
-# Build table rows
-rows = []
-for t in range(len(results)):
-    inv_row = [results[t][f"Node {i+1} Inv"] for i in range(st.session_state.sim.num_nodes)]
-    demand_val = st.session_state.sim.customer_demand_history[t] if t < len(st.session_state.sim.customer_demand_history) else ""
-    rows.append(inv_row + [demand_val])
-
-st.table([headers] + rows)
-
-# Draw supply chain diagram
-fig, ax = plt.subplots(figsize=(2*num_nodes, 5))
-ax.axis('off')
-
-node_x = [2*i for i in range(num_nodes)]
-node_y = [3]*num_nodes
-
-# Draw nodes
-for i in range(num_nodes):
-    ax.add_patch(plt.Circle((node_x[i], node_y[i]), 0.4, color='violet', zorder=2))  # Restore original node size
-    ax.text(node_x[i], node_y[i]+0.7, f"Node {i+1}", ha='center', fontsize=12, fontweight='bold')
-    # Show real-time inventory from inventory_units
-    ax.text(node_x[i], node_y[i]+0.4, f"Inventory: {len(sim.nodes[i].inventory_units)}", ha='center', fontsize=10, color='purple')
-
-# Draw arrows and queue details
-for i in range(num_nodes-1):
-    # Arrow for product flow (downstream)
-    ax.arrow(node_x[i+1]-0.5, node_y[i], -1, 0, head_width=0.2, head_length=0.2, fc='blue', ec='blue', length_includes_head=True, zorder=1)
-    # Arrow for order flow (upstream)
-    ax.arrow(node_x[i]+0.5, node_y[i]+0.2, 1, 0, head_width=0.15, head_length=0.15, fc='magenta', ec='magenta', length_includes_head=True, zorder=1)
-    # Shipments in transit (downstream)
-    shipments = list(sim.nodes[i].incoming_shipments)
-    shipment_str = ', '.join([
-        f"(arrives:{arr}, unit:{getattr(unit, 'id', unit)}, sent:{sent}, requested:{req})"
-        for shipment in shipments
-        for (arr, unit, sent, *rest) in [shipment]
-        for req in (rest[0] if rest else None,)
-    ])
-    ax.text(node_x[i], node_y[i]-0.7, f"Shipments in Transit: {shipment_str}", ha='center', fontsize=9, color='blue')
-
-# Last node shipments
-shipments_last = list(sim.nodes[-1].incoming_shipments)
-shipment_str_last = ', '.join([
-    f"(arrives:{arr}, unit:{getattr(unit, 'id', unit)}, sent:{sent}, requested:{req})"
-    for shipment in shipments_last
-    for (arr, unit, sent, *rest) in [shipment]
-    for req in (rest[0] if rest else None,)
-])
-ax.text(node_x[-1], node_y[-1]-0.7, f"Shipments in Transit: {shipment_str_last}", ha='center', fontsize=9, color='blue')
-
-st.pyplot(fig)
-
-# After simulation run, show tracked units table
-
-# Show modular metrics table from MetricsLogger
-if hasattr(st.session_state.sim, 'metrics_logger'):
-    # Show a table with the average value for each cycle time metric at each timestep
-    st.subheader("Average Cycle Times (History)")
-    # Only add to history if not already done this step (avoid duplicate rows)
-    if not sim.is_finished() or not sim.metrics_logger.cycle_time_history:
-        sim.metrics_logger.compute_cycle_times(save_history=True)
-    cycle_time_history = sim.metrics_logger.get_cycle_time_history()
-    if not cycle_time_history.empty:
-        st.dataframe(cycle_time_history, height=400, use_container_width=True)
+    if runner is not None and runner.is_active():
+        pause_col, cancel_col = st.columns(2)
+        if runner.state == 'running':
+            pause_col.button("Pause", key="pause_run_btn_main", on_click=runner.pause)
+        else:
+            pause_col.button("Resume", key="resume_run_btn_main", on_click=runner.resume)
+        cancel_col.button("Cancel", key="cancel_run_btn_main", on_click=stop_runner)
+    else:
+        st.button("Run Full Simulation", key="run_full_sim_btn_main", on_click=start_background_run, disabled=sim.is_finished())
+
+@st.fragment(run_every=POLL_INTERVAL if running else None)
+def live_charts():
+    # Polls a background run; the rest of the page is refreshed once it ends
+    runner = st.session_state.get('runner')
+    if runner is not None:
+        state = runner.state
+        st.progress(runner.progress(), text=f"Background run {state}: time {runner.sim.time} of {runner.sim.max_time}")
+        if runner.error is not None:
+            st.error(f"Background run failed: {runner.error!r}")
+        if running and state != 'running':
+            st.rerun()
+    charts = st.session_state.charts
+    # Only the bounded chart data is copied under the lock
+    with sim_lock:
+        inventory = series_frame(charts['inventory'])
+        customer_queue = series_frame(charts['customer_queue'])
+        cycle_times = series_frame(charts['cycle_times'])
+        demand = charts['demand'].to_frame()
+    if inventory.empty:
+        return
+    chart_inv, chart_queue = st.columns(2)
+    chart_inv.caption("Inventory")
+    chart_inv.vega_lite_chart(inventory, line_chart_spec(), width='stretch')
+    chart_queue.caption("Customer Queue")
+    chart_queue.vega_lite_chart(customer_queue, line_chart_spec(), width='stretch')
+    chart_cycle, chart_demand = st.columns(2)
+    chart_cycle.caption("Average Cycle Times")
+    chart_cycle.vega_lite_chart(cycle_times, line_chart_spec(), width='stretch')
+    chart_demand.caption("Customer Demand per Step")
+    chart_demand.vega_lite_chart(demand.reset_index(), histogram_spec("Demand"), width='stretch')
+
+live_charts()
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES)
+def node_stats_table(_sim, key):
+    def get_manufacturer_batches(node):
+        batches = getattr(node, 'active_batches', [])
+        batch_list = []
+        for batch in batches:
+            batch_list.append(
+                f"(start:{batch.start}, end:{batch.end}, qty:{len(batch.units)}, units:{[u.id for u in batch.units]})"
+            )
+        return batch_list
+
+    return {
+        f"Node {i+1}": {
+            "Inventory": _sim.nodes[i].inventory_count(),
+            "Customer Queue": [(arrival_time, qty, requested_time) for (arrival_time, qty, unit, requested_time) in list(_sim.nodes[i].customer_queue)],
+            "Supplier Queue": [(order_time, qty) for (order_time, qty, unit) in list(_sim.nodes[i].order_queue)],
+            "Shipments in Transit": [f"{units} due at {time}" for time, units in _sim.nodes[i].in_transit_by_arrival()],
+            **({
+                "Active Batches": get_manufacturer_batches(_sim.nodes[i])
+            } if getattr(_sim.nodes[i], 'is_manufacturer', False) else {})
+        } for i in range(_sim.num_nodes)
+    }
+
+def results_summary(charts):
+    # Per-node inventory statistics over all timesteps, from the running totals
+    stats = charts['inventory_stats']
+    return pd.DataFrame({
+        "Mean Inv": [s.mean() for s in stats.values()],
+        "Min Inv": [s.min for s in stats.values()],
+        "Max Inv": [s.max for s in stats.values()],
+        "Final Inv": [s.last for s in stats.values()],
+    }, index=list(stats))
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES)
+def results_page(_sim, key, start, stop):
+    # Inventories of every node and the customer demand for timesteps [start, stop)
+    df = pd.DataFrame(_sim.get_results(start, stop), columns=[f"Node {i+1} Inv" for i in range(_sim.num_nodes)],
+                      index=pd.RangeIndex(start, start + len(_sim.stats[start:stop]), name="Time"))
+    df["Demand"] = pd.array(_sim.customer_demand_history[start:stop], dtype="Int64")
+    return df
+
+def in_transit_label(node):
+    # Total units in transit and the first few due times; detail is in the drill-down below the diagram
+    arrivals = node.in_transit_by_arrival()
+    lines = [f"In transit: {node.incoming_shipments_count()}"]
+    lines += [f"t={time}: {units}" for time, units in arrivals[:DIAGRAM_DUE_TIMES]]
+    if len(arrivals) > DIAGRAM_DUE_TIMES:
+        lines.append(f"... {len(arrivals) - DIAGRAM_DUE_TIMES} more due times")
+    return "\n".join(lines)
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES)
+def supply_chain_diagram(_sim, key):
+    # Rendered to PNG once per (run, time) instead of redrawn on every rerun
+    num_nodes = _sim.num_nodes
+    fig, ax = plt.subplots(figsize=(2*num_nodes, 5))
+    ax.axis('off')
+
+    node_x = [2*i for i in range(num_nodes)]
+    node_y = [3]*num_nodes
+
+    # Draw nodes
+    for i in range(num_nodes):
+        ax.add_patch(plt.Circle((node_x[i], node_y[i]), 0.4, color='violet', zorder=2))  # Restore original node size
+        ax.text(node_x[i], node_y[i]+0.7, f"Node {i+1}", ha='center', fontsize=12, fontweight='bold')
+        # Show real-time inventory from inventory_units
+        ax.text(node_x[i], node_y[i]+0.4, f"Inventory: {_sim.nodes[i].inventory_count()}", ha='center', fontsize=10, color='purple')
+
+    # Draw arrows and queue details
+    for i in range(num_nodes):
+        if i < num_nodes - 1:
+            # Arrow for product flow (downstream)
+            ax.arrow(node_x[i+1]-0.5, node_y[i], -1, 0, head_width=0.2, head_length=0.2, fc='blue', ec='blue', length_includes_head=True, zorder=1)
+            # Arrow for order flow (upstream)
+            ax.arrow(node_x[i]+0.5, node_y[i]+0.2, 1, 0, head_width=0.15, head_length=0.15, fc='magenta', ec='magenta', length_includes_head=True, zorder=1)
+        # Shipments in transit (downstream), as units per due time
+        ax.text(node_x[i], node_y[i]-0.7, in_transit_label(_sim.nodes[i]), ha='center', va='top', fontsize=9, color='blue')
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES)
+def cycle_time_history_page(_sim, key, start, stop):
+    # Only history[start:stop] is turned into a DataFrame
+    return _sim.metrics_logger.get_cycle_time_history(start, stop)
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES)
+def metrics_summary(_sim, key):
+    # Units that reached each stage and the first/last time it happened
+    logger = _sim.metrics_logger
+    rows = []
+    for col in logger.columns[1:]:
+        values = logger.column_array(col)[logger.is_set(col)]
+        rows.append({
+            "Stage": col,
+            "Units": len(values),
+            "First": int(values.min()) if len(values) else None,
+            "Last": int(values.max()) if len(values) else None,
+        })
+    return pd.DataFrame(rows).set_index("Stage")
+
+@st.cache_data(max_entries=VIEW_CACHE_ENTRIES)
+def filtered_rows(_sim, key, filters):
+    return _sim.metrics_logger.select_rows(**filters)
+
+def pager(total, key):
+    """
+    Page size and page number controls for a table of `total` rows. Returns
+    the [start, stop) slice of the current page.
+    """
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    pages = max(1, -(-total // page_size))
+    # Keep the page in range when the table shrinks (e.g. after a filter change)
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = col_page.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    stop = min(start + page_size, total)
+    st.caption(f"Rows {start + 1 if total else 0}-{stop} of {total}")
+    return start, stop
+
+# Read the simulation under its lock; a background run waits between chunks meanwhile
+with sim_lock:
+    # Cache key of the derived views: they only change when the run advances
+    view_key = (st.session_state.run_token, sim.time)
+
+    charts = st.session_state.charts
+    # Show average demand immediately after controls
+    if charts['demand_stats'].count:
+        st.subheader(f"Average Demand: {charts['demand_stats'].mean():.2f}")
+
+    st.header(f"Time Step: {sim.time}")
+
+    # Show stats table
+    if show_node_stats:
+        st.subheader("Node Stats Table")
+        st.table(node_stats_table(sim, view_key))
+
+    # Add demand display to the main table
+    if show_simulation_results and sim.stats:
+        st.subheader("Simulation Results")
+        st.dataframe(results_summary(charts), width='stretch')
+        st.write(f"Total demand: {charts['demand_stats'].total}, mean per step: {charts['demand_stats'].mean():.2f}")
+        # Per-timestep rows only on request, one page at a time
+        if st.toggle("Show per-timestep results", key="show_results_rows"):
+            start, stop = pager(len(sim.stats), "results")
+            st.dataframe(results_page(sim, view_key, start, stop), width='stretch')
+
+    # Draw supply chain diagram
+    if show_supply_chain_figure:
+        st.image(supply_chain_diagram(sim, view_key))
+        # Per-unit detail of one node's shipments due at one time, on request
+        if st.toggle("Show shipments in transit detail", key="show_shipment_detail"):
+            col_node, col_due = st.columns(2)
+            detail_node = col_node.selectbox("Destination node", range(sim.num_nodes),
+                                             format_func=lambda i: f"Node {i+1}", key="shipment_detail_node")
+            arrivals = dict(sim.nodes[detail_node].in_transit_by_arrival())
+            due = col_due.selectbox("Due at", list(arrivals),
+                                    format_func=lambda t: f"t={t} ({arrivals[t]} units)", key="shipment_detail_due")
+            if due is None:
+                st.write("No shipments in transit.")
+            else:
+                st.dataframe(pd.DataFrame(
+                    [(str(unit.id), sent, requested) for _, unit, sent, requested in sim.nodes[detail_node].shipments_arriving_at(due)],
+                    columns=["Unit", "Sent", "Requested"]), width='stretch')
+
+    # Show modular metrics table from MetricsLogger
+    # Show the latest average value of each cycle time metric, with the history by timestep on request
+    st.subheader("Average Cycle Times")
+    history_length = len(sim.metrics_logger.cycle_time_history)
+    if history_length:
+        st.dataframe(cycle_time_history_page(sim, view_key, history_length - 1, history_length), width='stretch')
+        if st.toggle("Show cycle time history", key="show_cycle_history_rows"):
+            start, stop = pager(history_length, "cycle_history")
+            st.dataframe(cycle_time_history_page(sim, view_key, start, stop), width='stretch')
     else:
         st.write("No cycle time history yet.")
-    df_metrics = st.session_state.sim.metrics_logger.to_dataframe()
-    st.subheader("Per-Unit Metrics Table")
-    st.dataframe(df_metrics, height=600, use_container_width=True)
-    st.markdown("""
-        <style>
-        .stDataFrame td { white-space: normal !important; word-break: break-word !important; }
-        </style>
-        """, unsafe_allow_html=True)
-
-if sim.is_finished():
-    st.warning("Simulation finished. Press Reset to start again.")
+
+    st.subheader("Per-Unit Metrics")
+    st.dataframe(metrics_summary(sim, view_key), width='stretch')
+    if st.toggle("Browse per-unit rows", key="show_metrics_rows"):
+        col_node, col_from, col_to, col_undelivered = st.columns(4)
+        node = col_node.selectbox("Reached node", [None] + list(range(1, sim.num_nodes + 1)),
+                                  format_func=lambda n: "Any" if n is None else f"Node {n}", key="metrics_node_filter")
+        request_start = col_from.number_input("Requested from", min_value=0, value=None, step=1, key="metrics_start_filter")
+        request_end = col_to.number_input("Requested to", min_value=0, value=None, step=1, key="metrics_end_filter")
+        undelivered = col_undelivered.checkbox("Undelivered only", key="metrics_undelivered_filter")
+        filters = {'node': node, 'start': request_start, 'end': request_end, 'undelivered': undelivered}
+        rows = filtered_rows(sim, view_key, filters)
+        start, stop = pager(len(rows), "metrics")
+        # Only the visible page is turned into a DataFrame
+        st.dataframe(sim.metrics_logger.to_dataframe(rows[start:stop]), width='stretch')
+
+    if sim.is_finished():
+        st.warning("Simulation finished. Press Reset to start again.")
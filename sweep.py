@@ -0,0 +1,152 @@
+# Parameter sweep driver for MultiNodeSimulation
+# Runs a grid of configurations (a config.json-style base plus axes) on a
+# process pool and streams one summary row per run to a JSON Lines file.
+#
+# Example:
+#   python sweep.py --base config.json --axes '{"manufacturing_time": [1, 3, 5], "lag_times": [[1,1,1], [2,2,2]]}' --out sweep.jsonl
+# Rerunning the same command resumes: runs already in --out are skipped.
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from multi_node_simulation import MultiNodeSimulation
+
+# Config keys passed to MultiNodeSimulation
+SIMULATION_KEYS = ['num_nodes', 'initial_inventories', 'order_comm_lags', 'lag_times',
+                   'max_time', 'manufacturing_time', 'max_demand', 'aggregate']
+
+def build_grid(base, axes):
+    """
+    Returns one config dict per point of the cartesian product of `axes`
+    ({key: [values...]}), each a copy of `base` with that point's values.
+    """
+    keys = list(axes)
+    grid = []
+    for values in itertools.product(*(axes[k] for k in keys)):
+        config = dict(base)
+        config.update(zip(keys, values))
+        grid.append(config)
+    return grid
+
+def run_params(config, axis_keys=()):
+    """The simulation parameters plus every swept key (e.g. a replication index) of a config."""
+    keys = list(SIMULATION_KEYS) + [k for k in axis_keys if k not in SIMULATION_KEYS]
+    return {k: config.get(k) for k in keys}
+
+def run_id(config, seed=0, axis_keys=()):
+    """
+    Stable id of a run, independent of its position in the grid: it covers
+    the simulation parameters, every axis key and the sweep seed.
+    """
+    key = {'params': run_params(config, axis_keys), 'sweep_seed': seed}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+def run_seed(rid):
+    """Deterministic per-run seed derived from the run id."""
+    return int(rid, 16) >> 1
+
+def run_point(config, seed, rid, axis_keys=()):
+    """
+    Runs one configuration to max_time and returns its summary row.
+    """
+    num_nodes = config['num_nodes']
+    sim = MultiNodeSimulation(
+        num_nodes,
+        config['initial_inventories'],
+        config['order_comm_lags'],
+        config['lag_times'],
+        max_time=config.get('max_time', 100),
+        manufacturing_time=config.get('manufacturing_time', 3),
+        max_demand=config.get('max_demand', 50),
+        seed=seed,
+        aggregate=config.get('aggregate', False),
+    )
+    while not sim.is_finished():
+        sim.step()
+    ticks = max(len(sim.stats), 1)
+    row = {
+        'run_id': rid,
+        'seed': seed,
+        'params': {k: v for k, v in run_params(config, axis_keys).items() if k in config},
+        'total_demand': sum(sim.customer_demand_history),
+        'mean_inventories': [sum(s['inventories'][i] for s in sim.stats) / ticks for i in range(num_nodes)],
+        'mean_customer_queues': [sum(s['customer_queues'][i] for s in sim.stats) / ticks for i in range(num_nodes)],
+        'final_customer_queues': sim.stats[-1]['customer_queues'] if sim.stats else [0]*num_nodes,
+    }
+    if not sim.aggregate:
+        row['cycle_times'] = sim.metrics_logger.average_cycle_times()
+    return row
+
+def completed_run_ids(out_path):
+    """Run ids already written to `out_path` (ignores a truncated last line)."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['run_id'])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+def run_sweep(base, axes, out_path, workers=None, seed=0):
+    """
+    Runs every grid point not yet in `out_path` on a process pool, appending
+    each summary row as soon as its run finishes. Returns the number of runs
+    done in this call. If a run fails, the rows of all other runs are still
+    written before the first error is re-raised, so a rerun only redoes the
+    failed points.
+    """
+    done = completed_run_ids(out_path)
+    axis_keys = list(axes)
+    pending = {}
+    for config in build_grid(base, axes):
+        rid = run_id(config, seed, axis_keys)
+        if rid not in done and rid not in pending:
+            pending[rid] = config
+    if not pending:
+        return 0
+    error = None
+    written = 0
+    with open(out_path, "a") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_point, config, run_seed(rid), rid, axis_keys) for rid, config in pending.items()]
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+                continue
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            written += 1
+    if error is not None:
+        raise error
+    return written
+
+def load_json_arg(value):
+    # Accept either a path to a JSON file or an inline JSON string
+    if os.path.exists(value):
+        with open(value, "r") as f:
+            return json.load(f)
+    return json.loads(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep for MultiNodeSimulation")
+    parser.add_argument("--base", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json"),
+                        help="Base configuration (JSON file or inline JSON)")
+    parser.add_argument("--axes", required=True, help="Sweep axes {key: [values...]} (JSON file or inline JSON)")
+    parser.add_argument("--out", required=True, help="JSON Lines output; existing runs are skipped")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="Sweep seed from which per-run seeds are derived")
+    args = parser.parse_args()
+    count = run_sweep(load_json_arg(args.base), load_json_arg(args.axes), args.out, workers=args.workers, seed=args.seed)
+    print(f"Completed {count} runs, results in {args.out}")
+
+if __name__ == "__main__":
+    main()